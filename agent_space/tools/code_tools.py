@@ -11,6 +11,10 @@ from typing import Dict, Any, List, Optional
 from contextlib import redirect_stdout, redirect_stderr
 import threading
 import queue
+from pathlib import Path
+
+from core.capability_registry import CapabilityRegistry, _build_import_trie, _trie_covers
+from config.settings import settings
 
 ALLOWED_IMPORTS = [
     "numpy", "pandas", "matplotlib", "seaborn",
@@ -26,6 +30,13 @@ BLOCKED_IMPORTS = [
     "ctypes", "importlib", "builtins", "__builtins__"
 ]
 
+# The built-in lists are the floor of the sandbox policy: capabilities.yaml
+# (code_execution.python) can block more or allow more, but never unblock a
+# built-in entry, and a missing or unreadable config leaves the floor in place
+_ALLOWED_TRIE = _build_import_trie(ALLOWED_IMPORTS)
+_BLOCKED_TRIE = _build_import_trie(BLOCKED_IMPORTS)
+CAPABILITIES_PATH = Path(settings.config_dir) / "capabilities.yaml"
+
 TIMEOUT_SECONDS = 30
 MAX_OUTPUT_SIZE = 100000  # 100KB
 
@@ -41,19 +52,27 @@ class CodeValidator:
         except SyntaxError as e:
             return False, f"Syntax error: {e}"
         
+        try:
+            registry = CapabilityRegistry.get(CAPABILITIES_PATH)
+        except Exception:
+            registry = None
+        
         for node in ast.walk(tree):
             if isinstance(node, ast.Import):
-                for alias in node.names:
-                    module = alias.name.split('.')[0]
-                    if module in BLOCKED_IMPORTS:
-                        return False, f"Blocked import: {module}"
-                    if module not in ALLOWED_IMPORTS and module not in ['math', 'json', 're']:
-                        return False, f"Import not in allowlist: {module}"
-            
+                modules = [alias.name for alias in node.names]
             elif isinstance(node, ast.ImportFrom):
-                module = node.module.split('.')[0] if node.module else ''
-                if module in BLOCKED_IMPORTS:
+                if node.level or not node.module:
+                    return False, "Relative imports are not allowed"
+                modules = [node.module]
+            else:
+                continue
+            
+            for module in modules:
+                if _trie_covers(_BLOCKED_TRIE, module) or (registry and registry.is_import_blocked(module)):
                     return False, f"Blocked import: {module}"
+                if not (_trie_covers(_ALLOWED_TRIE, module)
+                        or (registry and registry.is_import_allowed(module))):
+                    return False, f"Import not in allowlist: {module}"
         
         return True, "OK"
     
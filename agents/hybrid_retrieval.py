@@ -5,6 +5,7 @@ Hybrid Retrieval Agent - ترکیب Vector + Keyword Search
 
 import re
 import logging
+import numpy as np
 from typing import Dict, Any, List, Tuple, Optional
 from dataclasses import dataclass
 from collections import defaultdict
@@ -72,7 +73,8 @@ class HybridRetrievalAgent:
         
         try:
             # 1. Vector Search
-            vector_results = self._vector_search(query, k * 2)
+            vector_results = self._vector_search(query, k * 2, context.get("prefetched_search"),
+                                                 context.get("query_embedding"))
             logger.debug(f"Vector search returned {len(vector_results)} results")
             
             # 2. Keyword Search
@@ -106,12 +108,18 @@ class HybridRetrievalAgent:
             logger.error(f"Hybrid retrieval error: {e}")
             return self._empty_result(str(e))
     
-    def _vector_search(self, query: str, k: int) -> List[SearchResult]:
-        """Vector similarity search"""
+    def _vector_search(self, query: str, k: int, prefetched: Optional[Dict[str, Any]] = None,
+                       embedding: Optional[np.ndarray] = None) -> List[SearchResult]:
+        """Vector similarity search (reuses a batched search_batch row or the query's embedding when provided)"""
         results = []
         
         try:
-            search_result = self.vs.search(query, k=k)
+            if prefetched is not None:
+                search_result = prefetched
+            elif embedding is not None:
+                search_result = self.vs.search_embeddings(embedding, k=k)[0]
+            else:
+                search_result = self.vs.search(query, k=k)
             
             documents = search_result.get('documents', [])
             metadatas = search_result.get('metadatas', [])
@@ -135,6 +143,18 @@ class HybridRetrievalAgent:
         
         return results
     
+    def _snapshot_corpus(self):
+        """(documents, metadatas) as a consistent view safe against concurrent writes"""
+        # VectorStore shares one immutable snapshot between writes: no copy, no lock wait
+        if hasattr(self.vs, 'get_snapshot'):
+            snap = self.vs.get_snapshot()
+            return snap['documents'], snap['metadatas']
+        lock = getattr(self.vs, '_lock', None)
+        if lock:
+            with lock:
+                return list(getattr(self.vs, 'documents', [])), list(getattr(self.vs, 'metadatas', []))
+        return getattr(self.vs, 'documents', []), getattr(self.vs, 'metadatas', [])
+    
     def _keyword_search(self, query: str, k: int) -> List[SearchResult]:
         """Keyword-based exact match search using heap for top-k efficiency"""
         import heapq
@@ -147,15 +167,7 @@ class HybridRetrievalAgent:
         if not keywords:
             return results
         
-        # Snapshot under lock to avoid race conditions with concurrent modifications
-        lock = getattr(self.vs, '_lock', None)
-        if lock:
-            with lock:
-                all_docs = list(getattr(self.vs, 'documents', []))
-                all_metas = list(getattr(self.vs, 'metadatas', []))
-        else:
-            all_docs = getattr(self.vs, 'documents', [])
-            all_metas = getattr(self.vs, 'metadatas', [])
+        all_docs, all_metas = self._snapshot_corpus()
         
         if not all_docs:
             logger.warning("No documents in vector store for keyword search")
@@ -201,16 +213,8 @@ class HybridRetrievalAgent:
         
         logger.info(f"🔢 Searching for sections: {sections}")
         
-        # Snapshot under lock to avoid race conditions
         try:
-            lock = getattr(self.vs, '_lock', None)
-            if lock:
-                with lock:
-                    all_docs = list(getattr(self.vs, 'documents', []))
-                    all_metas = list(getattr(self.vs, 'metadatas', []))
-            else:
-                all_docs = getattr(self.vs, 'documents', [])
-                all_metas = getattr(self.vs, 'metadatas', [])
+            all_docs, all_metas = self._snapshot_corpus()
             
             if not all_docs:
                 logger.warning("⚠️ Vector store is empty for section search")
@@ -324,8 +324,8 @@ Please try:
                 paths = [p.strip() for p in meta['images'].split(',') if p.strip()]
                 all_image_paths.extend(paths)
         
-        multimodal_available = self.llm_client.multimodal_health_check()
-        use_multimodal = multimodal_available and len(all_image_paths) > 0
+        # Only probe the multimodal server when there are images to send it
+        use_multimodal = len(all_image_paths) > 0 and self.llm_client.multimodal_health_check()
         
         if use_multimodal:
             self.log(f"Using multimodal server with {len(all_image_paths)} image(s)")
@@ -0,0 +1,10 @@
+"""
+API package
+Makes the project root importable once for the route modules
+"""
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
@@ -0,0 +1,47 @@
+"""
+Recent-sessions cache shared by the API server and the sessions router
+"""
+import asyncio
+import time
+from typing import Dict
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+
+from core.session_manager import session_manager
+
+# Sidebar pollers hit /recent constantly; serve them from a short-lived cache of
+# the encoded body, so a hit builds a fresh response and shares nothing mutable.
+# Each entry is a future: concurrent misses share one DB query (single flight),
+# which runs on the threadpool so the event loop is never blocked on it
+RECENT_SESSIONS_TTL = 2.0
+RECENT_SESSIONS_MAX_LIMIT = 50  # larger limits are not cached
+_recent_cache: Dict[int, tuple] = {}  # limit -> (monotonic time, future of JSON bytes)
+
+
+def invalidate_recent_sessions():
+    _recent_cache.clear()
+
+
+def _encode_recent_sessions(limit: int) -> bytes:
+    return orjson.dumps(session_manager.list_sessions(limit=limit))
+
+
+async def recent_sessions_body(limit: int) -> bytes:
+    """JSON body for the recent-sessions listing, cached for RECENT_SESSIONS_TTL"""
+    if limit > RECENT_SESSIONS_MAX_LIMIT:
+        return await run_in_threadpool(_encode_recent_sessions, limit)
+    now = time.monotonic()
+    cached = _recent_cache.get(limit)
+    if cached and now - cached[0] < RECENT_SESSIONS_TTL:
+        future = cached[1]
+    else:
+        future = asyncio.ensure_future(run_in_threadpool(_encode_recent_sessions, limit))
+        _recent_cache[limit] = (now, future)
+    try:
+        # shield: a cancelled caller must not cancel the query other callers share
+        return await asyncio.shield(future)
+    except Exception:
+        if _recent_cache.get(limit, (None, None))[1] is future:
+            del _recent_cache[limit]
+        raise
@@ -1,4 +1,4 @@
 from .sessions import router as sessions_router
-from .agent_space import router as agent_space_router
+from .agent_space import router as agent_space_router, tool_execution_error_handler
 
-__all__ = ['sessions_router', 'agent_space_router']
+__all__ = ['sessions_router', 'agent_space_router', 'tool_execution_error_handler']
@@ -3,13 +3,11 @@ Agent Space API Routes
 Handles tool execution and capability management
 """
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
 from pathlib import Path
-
-import sys
-from pathlib import Path as _Path
-sys.path.insert(0, str(_Path(__file__).resolve().parent.parent.parent))
+import inspect
 
 from core.capability_registry import CapabilityRegistry
 from agent_space.tools import (
@@ -17,6 +15,7 @@ from agent_space.tools import (
     python_executor, data_analyzer, visualizer
 )
 from config.settings import settings
+import orjson
 import re as _re
 
 def sanitize_error(e, generic_msg='An internal error occurred'):
@@ -30,7 +29,7 @@ def sanitize_error(e, generic_msg='An internal error occurred'):
 
 router = APIRouter(prefix="/api/agent-space", tags=["agent-space"])
 
-capability_registry = CapabilityRegistry(Path(settings.config_dir) / "capabilities.yaml")
+capability_registry = CapabilityRegistry.get(Path(settings.config_dir) / "capabilities.yaml")
 
 
 class ExecuteToolRequest(BaseModel):
@@ -46,6 +45,27 @@ class ToolResponse(BaseModel):
     execution_time: Optional[float] = None
 
 
+def _tool_response(success: bool, result: Optional[Dict[str, Any]] = None,
+                   error: Optional[str] = None, execution_time: Optional[float] = None,
+                   status_code: int = 200) -> Response:
+    """Encode a ToolResponse payload straight to bytes, skipping model validation"""
+    return Response(
+        content=orjson.dumps({
+            "success": success,
+            "result": result,
+            "error": error,
+            "execution_time": execution_time
+        }, default=str),
+        status_code=status_code,
+        media_type="application/json"
+    )
+
+
+async def tool_execution_error_handler(request, exc: Exception) -> Response:
+    """App-level handler for errors escaping a route (register with app.add_exception_handler)"""
+    return _tool_response(success=False, error=sanitize_error(exc), status_code=500)
+
+
 AVAILABLE_TOOLS = {
     "read_file": file_reader.execute,
     "write_file": file_writer.execute,
@@ -55,6 +75,10 @@ AVAILABLE_TOOLS = {
     "create_visualization": visualizer.execute,
 }
 
+_AVAILABLE_TOOL_NAMES = tuple(AVAILABLE_TOOLS)
+_TOOL_SIGNATURES = {name: inspect.signature(func) for name, func in AVAILABLE_TOOLS.items()}
+_UNKNOWN_TOOL_SUFFIX = f" Available: {list(_AVAILABLE_TOOL_NAMES)}"
+
 
 @router.get("/capabilities")
 async def get_capabilities():
@@ -86,42 +110,41 @@ async def list_tools():
     return {"tools": tools}
 
 
-@router.post("/execute", response_model=ToolResponse)
+@router.post("/execute", responses={200: {"model": ToolResponse}})
 async def execute_tool(request: ExecuteToolRequest):
     """Execute an agent tool"""
     tool_name = request.tool
     params = request.params
     
-    if tool_name not in AVAILABLE_TOOLS:
+    tool_func = AVAILABLE_TOOLS.get(tool_name)
+    if tool_func is None:
         raise HTTPException(
             status_code=400,
-            detail=f"Unknown tool: {tool_name}. Available: {list(AVAILABLE_TOOLS.keys())}"
+            detail=f"Unknown tool: {tool_name}.{_UNKNOWN_TOOL_SUFFIX}"
         )
     
+    try:
+        _TOOL_SIGNATURES[tool_name].bind(**params)
+    except TypeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid params for {tool_name}: {e}")
+    
     import time
     start_time = time.time()
     
     try:
-        tool_func = AVAILABLE_TOOLS[tool_name]
         result = tool_func(**params)
-        execution_time = time.time() - start_time
-        
-        success = result.get("success", True) if isinstance(result, dict) else True
-        
-        return ToolResponse(
-            success=success,
-            result=result,
-            error=result.get("error") if isinstance(result, dict) else None,
-            execution_time=execution_time
-        )
-    except Exception as e:
-        execution_time = time.time() - start_time
-        return ToolResponse(
-            success=False,
-            result=None,
-            error=str(e),
-            execution_time=execution_time
-        )
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=sanitize_error(e))
+    execution_time = time.time() - start_time
+    
+    success = result.get("success", True) if isinstance(result, dict) else True
+    
+    return _tool_response(
+        success=success,
+        result=result,
+        error=result.get("error") if isinstance(result, dict) else None,
+        execution_time=execution_time
+    )
 
 
 @router.post("/execute/python")
@@ -182,9 +205,7 @@ class CheckPermissionRequest(BaseModel):
     duration: Optional[float] = None
 
 
-@router.post("/check-permission")
-async def check_permission(request: CheckPermissionRequest):
-    """Check if an action is permitted"""
+def _permission_extra(request: CheckPermissionRequest) -> Dict[str, Any]:
     extra = {}
     if request.file_size is not None:
         extra["file_size"] = request.file_size
@@ -192,8 +213,33 @@ async def check_permission(request: CheckPermissionRequest):
         extra["extension"] = request.extension
     if request.duration is not None:
         extra["duration"] = request.duration
+    return extra
+
+
+@router.post("/check-permission")
+async def check_permission(request: CheckPermissionRequest):
+    """Check if an action is permitted"""
+    extra = _permission_extra(request)
     allowed, reason = capability_registry.check_permission(request.category, request.name, **extra)
     return {
         "allowed": allowed,
         "reason": reason
     }
+
+
+@router.post("/check-permissions")
+async def check_permissions(requests: List[CheckPermissionRequest]):
+    """Check several actions in one round-trip"""
+    get_capability = capability_registry.get_capability
+    seen: Dict[tuple, tuple] = {}
+    results = []
+    for request in requests:
+        key = (request.category, request.name, request.file_size, request.extension, request.duration)
+        if key not in seen:
+            cap = get_capability(request.category, request.name)
+            seen[key] = capability_registry.evaluate_permission(
+                cap, request.category, request.name, **_permission_extra(request)
+            )
+        allowed, reason = seen[key]
+        results.append({"allowed": allowed, "reason": reason})
+    return results
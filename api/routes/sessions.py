@@ -3,15 +3,15 @@ Session API Routes
 Handles chat session management endpoints
 """
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 
-import sys
+import orjson
 import re as _re
-from pathlib import Path
-sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 
 from core.session_manager import session_manager
+from api.recent_sessions import recent_sessions_body, invalidate_recent_sessions
 
 def sanitize_error(e: Exception, generic_msg: str = "An internal error occurred") -> str:
     """Sanitize exception messages to prevent information leakage."""
@@ -28,7 +28,6 @@ def sanitize_error(e: Exception, generic_msg: str = "An internal error occurred"
 
 router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 
-
 class CreateSessionRequest(BaseModel):
     title: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
@@ -41,6 +40,9 @@ class UpdateSessionRequest(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 
+_UPDATE_FIELDS = frozenset(UpdateSessionRequest.model_fields)
+
+
 class SessionResponse(BaseModel):
     id: str
     title: Optional[str]
@@ -56,6 +58,7 @@ async def create_session(request: CreateSessionRequest):
     """Create a new chat session"""
     try:
         session = session_manager.create_session(title=request.title)
+        invalidate_recent_sessions()
         return session
     except Exception as e:
         raise HTTPException(status_code=500, detail=sanitize_error(e))
@@ -73,7 +76,8 @@ async def list_sessions(
         sessions = session_manager.list_sessions(status=status, limit=limit, offset=offset)
         
         if search:
-            sessions = [s for s in sessions if search.lower() in (s.get('title') or '').lower()]
+            needle = search.casefold()
+            sessions = [s for s in sessions if needle in (s.get('title') or '').casefold()]
         
         return {
             "sessions": sessions,
@@ -89,7 +93,8 @@ async def list_sessions(
 async def get_recent_sessions(limit: int = Query(20, ge=1, le=50)):
     """Get recently active sessions"""
     try:
-        return session_manager.list_sessions(limit=limit)
+        body = await recent_sessions_body(limit)
+        return Response(body, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=sanitize_error(e))
 
@@ -116,8 +121,9 @@ async def get_session(session_id: str, include_messages: bool = False, limit: in
 async def update_session(session_id: str, request: UpdateSessionRequest):
     """Update session properties"""
     try:
-        updates = request.dict(exclude_none=True)
+        updates = request.model_dump(include=_UPDATE_FIELDS, exclude_none=True)
         session = session_manager.update_session(session_id, **updates)
+        invalidate_recent_sessions()
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         return session
@@ -132,6 +138,7 @@ async def delete_session(session_id: str, hard_delete: bool = False):
     """Delete a session"""
     try:
         success = session_manager.delete_session(session_id, hard_delete=hard_delete)
+        invalidate_recent_sessions()
         if not success:
             raise HTTPException(status_code=404, detail="Session not found")
         return {"success": True, "message": "Session deleted"}
@@ -146,6 +153,7 @@ async def archive_session(session_id: str):
     """Archive a session"""
     try:
         success = session_manager.archive_session(session_id)
+        invalidate_recent_sessions()
         if not success:
             raise HTTPException(status_code=404, detail="Session not found")
         return {"success": True, "message": "Session archived"}
@@ -160,6 +168,7 @@ async def resume_session(session_id: str):
     """Resume an archived or idle session"""
     try:
         session = session_manager.resume_session(session_id)
+        invalidate_recent_sessions()
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         return {"success": True, "session": session, "context_loaded": True}
@@ -169,21 +178,37 @@ async def resume_session(session_id: str):
         raise HTTPException(status_code=500, detail=sanitize_error(e))
 
 
+def _stream_messages(first: Optional[Dict[str, Any]], rest: Iterator[Dict[str, Any]], limit: int):
+    """Encode messages as a JSON object one row at a time"""
+    yield b'{"messages":['
+    count = 0
+    if first is not None:
+        yield orjson.dumps(first)
+        count = 1
+        for message in rest:
+            yield b',' + orjson.dumps(message)
+            count += 1
+    yield b'],"has_more":' + (b'true' if count == limit else b'false') + b'}'
+
+
 @router.get("/{session_id}/messages", response_model=Dict[str, Any])
 async def get_session_messages(
     session_id: str,
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0)
 ):
-    """Get messages for a session"""
+    """Get messages for a session (streamed)"""
     try:
-        messages = session_manager.get_messages(session_id, limit=limit, offset=offset)
-        return {
-            "messages": messages,
-            "has_more": len(messages) == limit
-        }
+        messages = session_manager.iter_messages(session_id, limit=limit, offset=offset)
+        # Pull the first row eagerly so DB errors still surface as a 500
+        first = next(messages, None)
     except Exception as e:
         raise HTTPException(status_code=500, detail=sanitize_error(e))
+    
+    return StreamingResponse(
+        _stream_messages(first, messages, limit),
+        media_type="application/json"
+    )
 
 
 @router.get("/{session_id}/summary")
@@ -1,33 +1,42 @@
 import os
 os.environ["TRANSFORMERS_NO_TF"] = "1"
 
+import asyncio
 import faiss
 import numpy as np
 import hashlib
 import re
 
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import Depends, FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional
 import uvicorn
+import aiofiles
+import orjson
 import shutil
-import json
-from threading import Thread
+import threading
+from datetime import datetime
 
 from main_engine import Orchestrator
 from llm_client import LLMClient
-from vector_store import VectorStore
+from vector_store import VectorStore, VECTOR_STORE_OPTIONS
 from cache import get_cache
-from ingestion import DocumentProcessor
+from ingestion import DocumentProcessor, PROCESSORS_BY_EXT, extract_chunks
 from export_utils import export_chat
 
 try:
     from core.session_manager import session_manager
     from database.connection import init_database
+    from api.recent_sessions import recent_sessions_body, invalidate_recent_sessions
     init_database()  # Ensure DB tables exist before any session operations
     SESSION_SUPPORT = True
 except ImportError as e:
@@ -35,6 +44,20 @@ except ImportError as e:
     SESSION_SUPPORT = False
     session_manager = None
 
+# Captioning/transcription run here so model inference never blocks the event loop;
+# a single worker also serializes access to the (not thread-safe) models
+model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model")
+# API_WORKERS > 1 runs independent server processes, each holding its own copy of the
+# vector store; use it only for read-mostly deployments with a pre-built KB, since an
+# upload lands in (and is persisted from) a single worker's copy
+API_WORKERS = max(1, int(os.getenv("API_WORKERS", "1")))
+# PDF/Word/RTF parsing and chunking is CPU-bound Python; it runs in worker processes
+# so uploads proceed in parallel without holding the GIL of the serving process.
+# The cores are split between server workers so N workers do not start N full pools
+INGEST_POOL = ProcessPoolExecutor(max_workers=max(1, ((os.cpu_count() or 2) - 1) // API_WORKERS))
+# /api/chat/stream runs each query on a pooled thread instead of spawning one per request
+STREAM_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("STREAM_WORKERS", "16")), thread_name_prefix="stream")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -42,7 +65,7 @@ async def lifespan(app: FastAPI):
     global llm_client, vector_store, processor, orchestrator, image_captioner, voice_transcriber, cache
 
     llm_client = LLMClient(base_url="http://127.0.0.1:8080")
-    vector_store = VectorStore(persist_directory="./faiss_db")
+    vector_store = VectorStore(persist_directory="./faiss_db", **VECTOR_STORE_OPTIONS)
     processor = DocumentProcessor(vector_store, chunk_size=800, chunk_overlap=160)
     cache = get_cache()
     cache.set_vector_store(vector_store)
@@ -74,7 +97,28 @@ async def lifespan(app: FastAPI):
     # Shutdown cleanup (if needed in the future)
 
 
-app = FastAPI(title="Agentic Research Assistant API", lifespan=lifespan)
+def _dumps(content) -> bytes:
+    """orjson encoding shared by responses and streams (numpy arrays/scalars serialize natively)"""
+    return orjson.dumps(content, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson via _dumps."""
+
+    def render(self, content) -> bytes:
+        return _dumps(content)
+
+
+def _model_response(model: BaseModel) -> Response:
+    """Serialize a response model with pydantic's Rust encoder, skipping FastAPI's re-validation"""
+    return Response(model.model_dump_json(), media_type="application/json")
+
+
+app = FastAPI(
+    title="Agentic Research Assistant API",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -105,6 +149,24 @@ class ExportRequest(BaseModel):
     chat_history: List[dict]
     format: str = 'markdown'
 
+def _json_body(model: type):
+    """
+    Dependency validating the raw body with model_validate_json: pydantic-core parses
+    the bytes directly instead of json.loads() followed by a second pass over the dict.
+    """
+    async def parse(request: Request):
+        try:
+            return model.model_validate_json(await request.body())
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+            )
+    return Depends(parse)
+
+def _json_body_openapi(model: type) -> dict:
+    # Body params resolved via Depends are invisible to OpenAPI; document them explicitly
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": model.model_json_schema()}}}}
+
 class ArtifactInfo(BaseModel):
     title: str
     type: str
@@ -133,10 +195,15 @@ class DocumentNode(BaseModel):
     type: str
     metadata: dict
 
+def cached_health() -> dict:
+    """LLM/multimodal server status; LLMClient reuses each probe for HEALTH_TTL seconds"""
+    return {"llm": llm_client.health_check(), "mm": llm_client.multimodal_health_check()}
+
 @app.get("/api/health")
 async def health():
-    llm_status = llm_client.health_check()
-    multimodal_status = llm_client.multimodal_health_check()
+    status = cached_health()
+    llm_status = status["llm"]
+    multimodal_status = status["mm"]
     
     return {
         "status": "ok" if llm_status else "degraded",
@@ -159,9 +226,10 @@ async def detailed_health():
     except Exception:
         cache_stats = {"total_entries": 0, "reuse_rate": 0}
     
+    status = cached_health()
     return {
-        "llm_status": llm_client.health_check(),
-        "multimodal_status": llm_client.multimodal_health_check(),
+        "llm_status": status["llm"],
+        "multimodal_status": status["mm"],
         "image_captioner_available": image_captioner is not None,
         "vector_store": vs_stats,
         "cache": cache_stats,
@@ -170,19 +238,70 @@ async def detailed_health():
 
 @app.get("/api/stats", response_model=KBStats)
 async def get_stats():
+    status = cached_health()
     return KBStats(
         document_count=vector_store.get_collection_count(),
-        llm_status=llm_client.health_check(),
-        multimodal_status=llm_client.multimodal_health_check()
+        llm_status=status["llm"],
+        multimodal_status=status["mm"]
+    )
+
+# SQLite has a single writer; queue message writes here instead of on its file lock
+DB_WRITE_LOCK = asyncio.Lock()
+
+async def _save_message(**kwargs):
+    async with DB_WRITE_LOCK:
+        # The SQLite call itself runs in the threadpool so a slow commit never stalls the loop
+        return await run_in_threadpool(session_manager.add_message, **kwargs)
+
+def _chat_response(result: dict) -> ChatResponse:
+    """ChatResponse for an orchestrator result"""
+    if not result['success']:
+        return ChatResponse(
+            success=False,
+            answer="",
+            confidence=0,
+            verified=False,
+            iterations=0,
+            sources=0,
+            logs=result.get('execution_log', []),
+            error=result.get('error', 'Unknown error')
+        )
+    
+    # Get image_paths directly from response
+    image_paths = [
+        ImageInfo(path=img.get('path', ''), source=img.get('source', ''), page=img.get('page', 0))
+        for img in result.get('image_paths', []) or []
+    ]
+    
+    # Get artifact info if present
+    artifact_data = result.get('artifact')
+    artifact = None
+    if artifact_data:
+        artifact = ArtifactInfo(
+            title=artifact_data.get('title', 'Artifact'),
+            type=artifact_data.get('type', 'document'),
+            content=artifact_data.get('content', '')
+        )
+    
+    return ChatResponse(
+        success=True,
+        answer=result['answer'],
+        confidence=result['confidence'],
+        verified=result['verified'],
+        iterations=result['num_iterations'],
+        sources=result['num_sources'],
+        logs=result.get('execution_log', []),
+        image_paths=image_paths,
+        artifact=artifact
     )
 
-@app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+@app.post("/api/chat", response_model=ChatResponse, openapi_extra=_json_body_openapi(ChatRequest))
+async def chat(request: ChatRequest = _json_body(ChatRequest)):
     if not request.message.strip():
         raise HTTPException(status_code=400, detail="Message cannot be empty")
     
-    if not llm_client.health_check():
-        return ChatResponse(
+    if not cached_health()["llm"]:
+        return _model_response(ChatResponse(
             success=False,
             answer="",
             confidence=0,
@@ -190,12 +309,12 @@ async def chat(request: ChatRequest):
             iterations=0,
             sources=0,
             error="LLM Server is offline"
-        )
+        ))
     
     # CHAT PERSISTENCE FIX: Save user message to database
     if SESSION_SUPPORT and request.session_id:
         try:
-            session_manager.add_message(
+            await _save_message(
                 session_id=request.session_id,
                 role="user",
                 content=request.message
@@ -210,7 +329,7 @@ async def chat(request: ChatRequest):
             # CHAT PERSISTENCE FIX: Save assistant response to database
             if SESSION_SUPPORT and request.session_id:
                 try:
-                    session_manager.add_message(
+                    await _save_message(
                         session_id=request.session_id,
                         role="assistant",
                         content=result['answer'],
@@ -223,50 +342,10 @@ async def chat(request: ChatRequest):
                     )
                 except Exception as e:
                     print(f"Warning: Failed to save assistant message: {e}")
-            
-            # Get image_paths directly from response
-            image_paths = []
-            raw_image_paths = result.get('image_paths', [])
-            if raw_image_paths:
-                image_paths = [
-                    ImageInfo(path=img.get('path', ''), source=img.get('source', ''), page=img.get('page', 0))
-                    for img in raw_image_paths
-                ]
-            
-            # Get artifact info if present
-            artifact_data = result.get('artifact')
-            artifact = None
-            if artifact_data:
-                artifact = ArtifactInfo(
-                    title=artifact_data.get('title', 'Artifact'),
-                    type=artifact_data.get('type', 'document'),
-                    content=artifact_data.get('content', '')
-                )
-            
-            return ChatResponse(
-                success=True,
-                answer=result['answer'],
-                confidence=result['confidence'],
-                verified=result['verified'],
-                iterations=result['num_iterations'],
-                sources=result['num_sources'],
-                logs=result.get('execution_log', []),
-                image_paths=image_paths,
-                artifact=artifact
-            )
-        else:
-            return ChatResponse(
-                success=False,
-                answer="",
-                confidence=0,
-                verified=False,
-                iterations=0,
-                sources=0,
-                logs=result.get('execution_log', []),
-                error=result.get('error', 'Unknown error')
-            )
+        
+        return _model_response(_chat_response(result))
     except Exception as e:
-        return ChatResponse(
+        return _model_response(ChatResponse(
             success=False,
             answer="",
             confidence=0,
@@ -274,21 +353,56 @@ async def chat(request: ChatRequest):
             iterations=0,
             sources=0,
             error=str(e)
-        )
+        ))
+
+
+class QueryBatchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=64)
+
+class QueryBatchResponse(BaseModel):
+    results: List[ChatResponse]
+
+@app.post("/api/query/batch", response_model=QueryBatchResponse, openapi_extra=_json_body_openapi(QueryBatchRequest))
+async def query_batch(request: QueryBatchRequest = _json_body(QueryBatchRequest)):
+    """Answer several independent queries in one call (no session persistence)"""
+    if any(not q.strip() for q in request.queries):
+        raise HTTPException(status_code=400, detail="Queries cannot be empty")
+    
+    if not cached_health()["llm"]:
+        raise HTTPException(status_code=503, detail="LLM Server is offline")
+    
+    try:
+        results = await run_in_threadpool(orchestrator.run_query_batch, request.queries)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=sanitize_error(e))
+    return _model_response(QueryBatchResponse(results=[_chat_response(r) for r in results]))
+
+
+SSE_BATCH_WINDOW = 0.010  # seconds of progress events coalesced per SSE frame
+
+
+def _encode_event(event_type: str, payload=None) -> tuple:
+    """(type, JSON bytes) queue item; encoding happens on the producing (worker) thread"""
+    event = {"type": event_type} if payload is None else {"type": event_type, "payload": payload}
+    return event_type, _dumps(event)
+
 
+def _sse_frame(data: bytes) -> bytes:
+    return b"data: " + data + b"\n\n"
 
-@app.post("/api/chat/stream")
-async def chat_stream(request: ChatRequest):
+
+@app.post("/api/chat/stream", openapi_extra=_json_body_openapi(ChatRequest))
+async def chat_stream(request: ChatRequest = _json_body(ChatRequest)):
     if not request.message.strip():
         raise HTTPException(status_code=400, detail="Message cannot be empty")
 
-    if not llm_client.health_check():
+    if not cached_health()["llm"]:
         raise HTTPException(status_code=503, detail="LLM Server is offline")
 
     # CHAT PERSISTENCE FIX: Save user message to database at start of stream
     if SESSION_SUPPORT and request.session_id:
         try:
-            session_manager.add_message(
+            await _save_message(
                 session_id=request.session_id,
                 role="user",
                 content=request.message
@@ -296,14 +410,12 @@ async def chat_stream(request: ChatRequest):
         except Exception as e:
             print(f"Warning: Failed to save user message in stream: {e}")
 
-    import asyncio
-
     async def event_generator():
         loop = asyncio.get_running_loop()
         async_queue: asyncio.Queue = asyncio.Queue()
         
         def progress_callback(event):
-            loop.call_soon_threadsafe(async_queue.put_nowait, {"type": "progress", "payload": event})
+            loop.call_soon_threadsafe(async_queue.put_nowait, _encode_event("progress", event))
 
         def worker():
             try:
@@ -349,12 +461,13 @@ async def chat_stream(request: ChatRequest):
                         "logs": result.get('execution_log', [])
                     }
 
-                loop.call_soon_threadsafe(async_queue.put_nowait, {"type": "final", "payload": payload})
+                loop.call_soon_threadsafe(async_queue.put_nowait, _encode_event("final", payload))
                 
                 # CHAT PERSISTENCE FIX: Save assistant response to database
                 if SESSION_SUPPORT and request.session_id and result.get('success'):
                     try:
-                        session_manager.add_message(
+                        # Runs on the event loop so it queues behind DB_WRITE_LOCK
+                        asyncio.run_coroutine_threadsafe(_save_message(
                             session_id=request.session_id,
                             role="assistant",
                             content=result.get('answer', ''),
@@ -364,21 +477,44 @@ async def chat_stream(request: ChatRequest):
                                 "sources": result.get('num_sources'),
                                 "iterations": result.get('num_iterations')
                             }
-                        )
+                        ), loop).result()
                     except Exception as e:
                         print(f"Warning: Failed to save assistant message in stream: {e}")
             except Exception as exc:
-                loop.call_soon_threadsafe(async_queue.put_nowait, {"type": "error", "payload": {"error": str(exc)}})
+                loop.call_soon_threadsafe(async_queue.put_nowait, _encode_event("error", {"error": str(exc)}))
             finally:
-                loop.call_soon_threadsafe(async_queue.put_nowait, {"type": "done"})
+                loop.call_soon_threadsafe(async_queue.put_nowait, ("done", None))
 
-        Thread(target=worker, daemon=True).start()
+        loop.run_in_executor(STREAM_POOL, worker)
 
+        pending = None
         while True:
-            event = await async_queue.get()
-            if event["type"] == "done":
+            event_type, data = pending or await async_queue.get()
+            pending = None
+            if event_type == "done":
                 break
-            yield f"data: {json.dumps(event)}\n\n"
+            if event_type != "progress":
+                yield _sse_frame(data)
+                continue
+
+            # Coalesce progress events arriving within the window into one frame;
+            # final/error/done are held back and flushed right after the batch
+            batch = [data]
+            deadline = loop.time() + SSE_BATCH_WINDOW
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    event = await asyncio.wait_for(async_queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if event[0] != "progress":
+                    pending = event
+                    break
+                batch.append(event[1])
+            if len(batch) == 1:
+                yield _sse_frame(batch[0])
+            else:
+                # Splice the already-encoded events; nothing is re-serialized
+                yield _sse_frame(b'{"type":"batch","events":[' + b",".join(batch) + b"]}")
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
@@ -397,41 +533,92 @@ def sanitize_error(e: Exception, generic_msg: str = "An internal error occurred"
         return generic_msg
     return msg or generic_msg
 
+# Anything but alphanumerics (\w is Unicode-aware, like str.isalnum), dots, hyphens, underscores
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\w.-]')
+
 def _sanitize_upload_filename(raw_filename: str) -> str:
     """Sanitize an uploaded filename: strip path components, allow only safe chars."""
     # Strip any directory components first (prevents path traversal)
     base = os.path.basename(raw_filename)
     # Keep only alphanumeric, dots, hyphens, underscores
-    safe = "".join(c for c in base if c.isalnum() or c in '._-')
+    safe = UNSAFE_FILENAME_CHARS.sub('', base)
     # Collapse leading dots to prevent hidden files
     safe = safe.lstrip('.')
     if not safe:
         safe = "upload"
     return safe
 
+# File type by extension; drives both upload validation and the document views
+EXT_TYPE = {
+    '.pdf': 'pdf',
+    '.png': 'image', '.jpg': 'image', '.jpeg': 'image',
+    '.wav': 'audio', '.mp3': 'audio', '.m4a': 'audio', '.ogg': 'audio',
+}
+
+def _ext(filename: Optional[str]) -> str:
+    return os.path.splitext(filename or '')[1].lower()
+
+def _source_type(source: str) -> str:
+    return EXT_TYPE.get(_ext(source), 'document')
+
+
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+async def _save_upload(file: UploadFile, file_path: str) -> str:
+    """Stream an upload to disk in fixed-size chunks and return its short content hash.
+    
+    Peak memory stays at one chunk, and oversize uploads are rejected as soon as they
+    cross MAX_FILE_SIZE_MB. The data goes to a .part file that only replaces file_path
+    once complete. SHA-256 runs on the CPU's SHA extensions (SHA-NI / ARMv8 SHA2)
+    through OpenSSL, so hashing inside the copy loop is cheap.
+    """
+    max_bytes = MAX_FILE_SIZE_MB * 1024 * 1024
+    part_path = file_path + ".part"
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(part_path, "wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=400, detail=f"File too large. Maximum size is {MAX_FILE_SIZE_MB}MB")
+                hasher.update(chunk)
+                await f.write(chunk)
+        os.replace(part_path, file_path)
+        _remember_file_size(file_path, size)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    return hasher.hexdigest()[:8]
+
+async def _ingest(file_path: str) -> dict:
+    """Parse/chunk a saved upload in INGEST_POOL, then embed and index it here"""
+    loop = asyncio.get_running_loop()
+    result, texts, metadatas, ids = await loop.run_in_executor(
+        INGEST_POOL, extract_chunks, file_path, processor.chunk_size, processor.chunk_overlap
+    )
+    if texts:
+        await loop.run_in_executor(None, vector_store.add_documents, texts, metadatas, ids)
+    return result
+
 @app.post("/api/upload/pdf")
 async def upload_pdf(file: UploadFile = File(...)):
-    if not file.filename or not file.filename.lower().endswith('.pdf'):
+    if _source_type(file.filename) != 'pdf':
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
     os.makedirs("./data", exist_ok=True)
     
     # Sanitize filename to prevent path traversal
     safe_filename = _sanitize_upload_filename(file.filename)
-    if not safe_filename.lower().endswith('.pdf'):
+    if _source_type(safe_filename) != 'pdf':
         safe_filename += '.pdf'
     file_path = os.path.join("./data", safe_filename)
     
-    content = await file.read()
-    file_size_mb = len(content) / (1024 * 1024)
-    if file_size_mb > MAX_FILE_SIZE_MB:
-        raise HTTPException(status_code=400, detail=f"File too large. Maximum size is {MAX_FILE_SIZE_MB}MB")
-    
-    with open(file_path, "wb") as f:
-        f.write(content)
+    await _save_upload(file, file_path)
     
     try:
-        result = processor.process_pdf(file_path)
+        result = await _ingest(file_path)
         # Invalidate cache when new document is uploaded
         cache.invalidate_by_kb()
         return {
@@ -445,45 +632,34 @@ async def upload_pdf(file: UploadFile = File(...)):
 
 @app.post("/api/upload/document")
 async def upload_document(file: UploadFile = File(...)):
-    allowed_extensions = ['.pdf', '.docx', '.doc', '.md', '.txt', '.rtf']
-    if not file.filename or not any(file.filename.lower().endswith(ext) for ext in allowed_extensions):
+    if _ext(file.filename) not in PROCESSORS_BY_EXT:
         raise HTTPException(status_code=400, detail="Unsupported document type")
 
     os.makedirs("./data", exist_ok=True)
     
-    # Read content and check size
-    content = await file.read()
-    file_size_mb = len(content) / (1024 * 1024)
-    if file_size_mb > MAX_FILE_SIZE_MB:
-        raise HTTPException(status_code=400, detail=f"File too large. Maximum size is {MAX_FILE_SIZE_MB}MB")
-    
     # Sanitize filename and derive extension from sanitized name
     safe_filename = _sanitize_upload_filename(file.filename)
     file_path = os.path.join("./data", safe_filename)
     # SECURITY: Extract extension from the SANITIZED filename, not the raw upload name
-    ext = os.path.splitext(safe_filename)[1].lower()
+    ext = _ext(safe_filename)
 
-    with open(file_path, "wb") as f:
-        f.write(content)
+    await _save_upload(file, file_path)
 
     try:
+        if ext not in PROCESSORS_BY_EXT:
+            raise HTTPException(status_code=400, detail="Unsupported document type")
+        result = await _ingest(file_path)
+        
         if ext == '.pdf':
-            result = processor.process_pdf(file_path)
             message = f"Processed {result['num_chunks']} chunks from {result['num_pages']} pages"
         elif ext in ['.docx', '.doc']:
-            result = processor.process_word(file_path)
             message = f"Processed {result['num_chunks']} chunks from Word document"
         elif ext == '.md':
-            result = processor.process_markdown(file_path)
             message = f"Processed {result['num_chunks']} chunks from Markdown file"
         elif ext == '.txt':
-            result = processor.process_text(file_path)
             message = f"Processed {result['num_chunks']} chunks from Text file"
-        elif ext == '.rtf':
-            result = processor.process_rtf(file_path)
-            message = f"Processed {result['num_chunks']} chunks from RTF file"
         else:
-            raise HTTPException(status_code=400, detail="Unsupported document type")
+            message = f"Processed {result['num_chunks']} chunks from RTF file"
 
         cache.invalidate_by_kb()
         return {
@@ -497,29 +673,24 @@ async def upload_document(file: UploadFile = File(...)):
 
 @app.post("/api/upload/image")
 async def upload_image(file: UploadFile = File(...)):
-    allowed_extensions = ['.png', '.jpg', '.jpeg']
-    if not file.filename or not any(file.filename.lower().endswith(ext) for ext in allowed_extensions):
+    if _source_type(file.filename) != 'image':
         raise HTTPException(status_code=400, detail="Only PNG, JPG, JPEG files are allowed")
     
     os.makedirs("./data", exist_ok=True)
     
-    # Read content and check size (BUG-005 FIX)
-    content = await file.read()
-    file_size_mb = len(content) / (1024 * 1024)
-    if file_size_mb > MAX_FILE_SIZE_MB:
-        raise HTTPException(status_code=400, detail=f"File too large. Maximum size is {MAX_FILE_SIZE_MB}MB")
-    
     # Sanitize filename
     safe_filename = _sanitize_upload_filename(file.filename)
     file_path = os.path.join("./data", safe_filename)
     
-    with open(file_path, "wb") as f:
-        f.write(content)
+    # Size is enforced while streaming (BUG-005 FIX)
+    file_hash = await _save_upload(file, file_path)
     
     try:
         if image_captioner is None:
             raise HTTPException(status_code=500, detail="Image captioner not available. Server may still be loading.")
-        caption = image_captioner.caption_image(file_path)
+        caption = await asyncio.get_running_loop().run_in_executor(
+            model_executor, image_captioner.caption_image, file_path
+        )
         
         text_with_caption = (
             f"[Uploaded Image] File: {file.filename}\n"
@@ -529,8 +700,6 @@ async def upload_image(file: UploadFile = File(...)):
             f"The uploaded photo contains visual content described as: {caption}."
         )
         
-        file_hash = hashlib.sha256(content).hexdigest()[:8]
-        
         metadata = {
             "source": file_path,
             "page": 0,
@@ -557,29 +726,24 @@ async def upload_image(file: UploadFile = File(...)):
 
 @app.post("/api/upload/audio")
 async def upload_audio(file: UploadFile = File(...)):
-    allowed_extensions = ['.wav', '.mp3', '.m4a', '.ogg']
-    if not file.filename or not any(file.filename.lower().endswith(ext) for ext in allowed_extensions):
+    if _source_type(file.filename) != 'audio':
         raise HTTPException(status_code=400, detail="Only WAV, MP3, M4A, OGG files are allowed")
     
     os.makedirs("./data", exist_ok=True)
     
-    # Read content and check size (BUG-005 FIX)
-    content = await file.read()
-    file_size_mb = len(content) / (1024 * 1024)
-    if file_size_mb > MAX_FILE_SIZE_MB:
-        raise HTTPException(status_code=400, detail=f"File too large. Maximum size is {MAX_FILE_SIZE_MB}MB")
-    
     # Sanitize filename
     safe_filename = _sanitize_upload_filename(file.filename)
     file_path = os.path.join("./data", safe_filename)
     
-    with open(file_path, "wb") as f:
-        f.write(content)
+    # Size is enforced while streaming (BUG-005 FIX)
+    file_hash = await _save_upload(file, file_path)
     
     try:
         if voice_transcriber is None:
             raise HTTPException(status_code=500, detail="Voice transcriber not available. Server may still be loading.")
-        transcription = voice_transcriber.transcribe(file_path)
+        transcription = await asyncio.get_running_loop().run_in_executor(
+            model_executor, voice_transcriber.transcribe, file_path
+        )
         
         if transcription.startswith("Error"):
             raise HTTPException(status_code=500, detail=transcription)
@@ -591,8 +755,6 @@ async def upload_audio(file: UploadFile = File(...)):
             f"Content: The audio recording says: {transcription}"
         )
         
-        file_hash = hashlib.sha256(content).hexdigest()[:8]
-        
         metadata = {
             "source": file_path,
             "page": 0,
@@ -632,7 +794,7 @@ async def clear_kb():
             shutil.rmtree("./faiss_db")
         
         global vector_store
-        vector_store = VectorStore(persist_directory="./faiss_db")
+        vector_store = VectorStore(persist_directory="./faiss_db", **VECTOR_STORE_OPTIONS)
         
         global processor
         processor = DocumentProcessor(vector_store, chunk_size=800, chunk_overlap=160)
@@ -646,54 +808,101 @@ async def clear_kb():
         
         # Clear all cache entries when KB is cleared
         cache.clear_all()
+        _forget_file_sizes()
         
         return {"success": True, "message": "Knowledge base cleared"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=sanitize_error(e))
 
+class KBTuneRequest(BaseModel):
+    nprobe: int = Field(..., ge=1, le=4096)
+
+@app.post("/api/kb/tune")
+async def tune_kb(request: KBTuneRequest):
+    """Adjust IVF search breadth at query time without reindexing"""
+    vector_store.set_nprobe(request.nprobe)
+    VECTOR_STORE_OPTIONS["nprobe"] = request.nprobe
+    return {"success": True, "nprobe": request.nprobe}
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def _wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def _ndjson_stream(rows, **trailer):
+    """Encode rows one per line, closing with a {"__total": N, ...} line"""
+    total = 0
+    for row in rows:
+        yield _dumps(row) + b"\n"
+        total += 1
+    yield _dumps({"__total": total, **trailer}) + b"\n"
+
+# Sizes of uploaded files by path: recorded by _save_upload as it writes them,
+# or stat'ed once for files ingested by an earlier run; misses are not remembered.
+# LRU-bounded, and entries are dropped when their document or the KB is deleted
+FILE_SIZES_MAX = 4096
+_file_sizes: "OrderedDict[str, int]" = OrderedDict()
+# Listings call _file_size from threadpool threads while uploads/deletes run on the loop
+_file_sizes_lock = threading.Lock()
+
+def _remember_file_size(path: str, size: int):
+    with _file_sizes_lock:
+        _file_sizes[path] = size
+        _file_sizes.move_to_end(path)
+        if len(_file_sizes) > FILE_SIZES_MAX:
+            _file_sizes.popitem(last=False)
+
+def _forget_file_sizes(paths=None):
+    """Drop the given paths, or every entry when paths is None"""
+    with _file_sizes_lock:
+        if paths is None:
+            _file_sizes.clear()
+        else:
+            for path in paths:
+                _file_sizes.pop(path, None)
+
+def _file_size(path: str) -> int:
+    with _file_sizes_lock:
+        size = _file_sizes.get(path)
+        if size is not None:
+            _file_sizes.move_to_end(path)
+            return size
+    try:
+        size = os.stat(path).st_size
+    except OSError:
+        return 0
+    _remember_file_size(path, size)
+    return size
+
+def _iter_document_entries(sources: list):
+    """Yield one listing entry per source summary from VectorStore.get_sources()"""
+    for entry in sources:
+        source = entry["source"]
+        yield {
+            "id": entry["file_hash"],
+            "name": os.path.basename(source),
+            "type": _source_type(source),
+            "path": source,
+            "chunks": entry["chunks"],
+            "images": entry["images"],
+            "size": _file_size(source)
+        }
+
 @app.get("/api/documents/list")
-async def get_documents_list():
+async def get_documents_list(request: Request):
+    """List documents; send `Accept: application/x-ndjson` to stream one per line"""
     try:
-        # Snapshot via public API to avoid coupling to _lock
-        snap = vector_store.get_snapshot()
-        snap_documents = snap['documents']
-        snap_metadatas = snap['metadatas']
-        
-        docs_map = {}
-        total_size = 0
-        
-        for idx, metadata in enumerate(snap_metadatas):
-            source = metadata.get('source', 'unknown')
-            file_hash = metadata.get('file_hash', 'unknown')
-            images = metadata.get('images', '')
-            
-            if source not in docs_map:
-                file_type = 'pdf' if source.endswith('.pdf') else 'image' if any(source.endswith(ext) for ext in ['.png', '.jpg', '.jpeg']) else 'audio' if any(source.endswith(ext) for ext in ['.wav', '.mp3', '.m4a', '.ogg']) else 'document'
-                
-                file_size = 0
-                if os.path.exists(source):
-                    file_size = os.path.getsize(source)
-                
-                docs_map[source] = {
-                    "id": file_hash,
-                    "name": os.path.basename(source),
-                    "type": file_type,
-                    "path": source,
-                    "chunks": 0,
-                    "images": 0,
-                    "size": file_size
-                }
-            
-            docs_map[source]["chunks"] += 1
-            if images:
-                docs_map[source]["images"] += len([x for x in images.split(',') if x.strip()])
-            
-            if idx < len(snap_documents):
-                total_size += len(snap_documents[idx].encode('utf-8'))
+        sources = vector_store.get_sources()
+        storage_bytes = vector_store.text_bytes
+        if _wants_ndjson(request):
+            return StreamingResponse(
+                _ndjson_stream(_iter_document_entries(sources), storage_bytes=storage_bytes),
+                media_type=NDJSON_MEDIA_TYPE
+            )
         
         return {
-            "documents": list(docs_map.values()),
-            "storage_bytes": total_size
+            "documents": list(_iter_document_entries(sources)),
+            "storage_bytes": storage_bytes
         }
     except Exception as e:
         return {"documents": [], "storage_bytes": 0, "error": str(e)}
@@ -701,12 +910,15 @@ async def get_documents_list():
 @app.delete("/api/documents/{file_hash}")
 async def delete_document(file_hash: str):
     try:
+        sources = [e["source"] for e in vector_store.get_sources() if e["file_hash"] == file_hash]
         # Use the efficient delete method
         deleted_count = vector_store.delete_by_file_hash(file_hash)
         
         if deleted_count == 0:
             return {"success": False, "error": "Document not found"}
         
+        _forget_file_sizes(sources)
+        
         # Invalidate cache after deletion
         cache.invalidate_by_kb()
         
@@ -714,62 +926,69 @@ async def delete_document(file_hash: str):
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def _graph_chunk_node(idx: int, metadata: dict, doc_text: str) -> dict:
+    file_hash = metadata.get('file_hash', 'unknown')
+    page = metadata.get('page', 0)
+    chunk_idx = metadata.get('chunk_index', 0)
+    images = metadata.get('images', '')
+    
+    image_nodes = []
+    if images:
+        for img_path in images.split(','):
+            img_path = img_path.strip()
+            if img_path:
+                img_name = os.path.basename(img_path)
+                image_nodes.append({
+                    "name": img_name,
+                    "type": "image",
+                    "id": f"{file_hash}_img_{img_name}",
+                    "path": img_path
+                })
+    
+    return {
+        "name": f"Chunk {chunk_idx} (Page {page})",
+        "type": "chunk",
+        "id": f"{file_hash}_chunk_{idx}",
+        "text": doc_text[:100] + "..." if len(doc_text) > 100 else doc_text,
+        "children": image_nodes
+    }
+
+def _iter_graph_nodes(snap_documents: list, snap_metadatas: list):
+    """Yield one document node (with its chunk children) per source, in first-seen order"""
+    # One pass buckets chunk indices by source; unlike sort + groupby this keeps
+    # first-seen order without an O(N log N) sort
+    groups = {}
+    for idx, metadata in enumerate(snap_metadatas):
+        groups.setdefault(metadata.get('source', 'unknown'), []).append(idx)
+    
+    n_docs = len(snap_documents)
+    for source, indices in groups.items():
+        yield {
+            "name": os.path.basename(source),
+            "type": _source_type(source),
+            "id": snap_metadatas[indices[0]].get('file_hash', 'unknown'),
+            "children": [
+                _graph_chunk_node(idx, snap_metadatas[idx], snap_documents[idx] if idx < n_docs else "")
+                for idx in indices
+            ]
+        }
+
 @app.get("/api/documents/graph")
-async def get_documents_graph():
+async def get_documents_graph(request: Request):
+    """Document tree; send `Accept: application/x-ndjson` to stream one source per line"""
     try:
         # Snapshot via public API
         snap = vector_store.get_snapshot()
-        snap_documents = snap['documents']
-        snap_metadatas = snap['metadatas']
+        nodes = _iter_graph_nodes(snap['documents'], snap['metadatas'])
+        
+        if _wants_ndjson(request):
+            return StreamingResponse(_ndjson_stream(nodes), media_type=NDJSON_MEDIA_TYPE)
         
         root = {
             "name": "Knowledge Base",
             "type": "root",
-            "children": []
+            "children": list(nodes)
         }
-        
-        doc_map = {}
-        
-        for idx, metadata in enumerate(snap_metadatas):
-            source = metadata.get('source', 'unknown')
-            file_hash = metadata.get('file_hash', 'unknown')
-            page = metadata.get('page', 0)
-            chunk_idx = metadata.get('chunk_index', 0)
-            images = metadata.get('images', '')
-            
-            if source not in doc_map:
-                file_type = 'pdf' if source.endswith('.pdf') else 'image' if any(source.endswith(ext) for ext in ['.png', '.jpg', '.jpeg']) else 'audio' if any(source.endswith(ext) for ext in ['.wav', '.mp3', '.m4a', '.ogg']) else 'document'
-                
-                doc_map[source] = {
-                    "name": os.path.basename(source),
-                    "type": file_type,
-                    "id": file_hash,
-                    "children": []
-                }
-                root["children"].append(doc_map[source])
-            
-            doc_text = snap_documents[idx] if idx < len(snap_documents) else ""
-            chunk_node = {
-                "name": f"Chunk {chunk_idx} (Page {page})",
-                "type": "chunk",
-                "id": f"{file_hash}_chunk_{idx}",
-                "text": doc_text[:100] + "..." if len(doc_text) > 100 else doc_text,
-                "children": []
-            }
-            
-            if images:
-                for img_path in images.split(','):
-                    img_path = img_path.strip()
-                    if img_path:
-                        chunk_node["children"].append({
-                            "name": os.path.basename(img_path),
-                            "type": "image",
-                            "id": f"{file_hash}_img_{os.path.basename(img_path)}",
-                            "path": img_path
-                        })
-            
-            doc_map[source]["children"].append(chunk_node)
-        
         return {"tree": root}
     except Exception as e:
         return {"tree": {"name": "Error", "children": []}, "error": str(e)}
@@ -785,6 +1004,7 @@ async def create_session(request: CreateSessionRequest = None):
         return {"id": f"temp_{id(title)}", "title": title or "New Chat", "message": "Session support not available"}
     try:
         session = session_manager.create_session(title=title)
+        invalidate_recent_sessions()
         return session
     except Exception as e:
         raise HTTPException(status_code=500, detail=sanitize_error(e))
@@ -795,7 +1015,7 @@ async def get_recent_sessions(limit: int = 20):
     if not SESSION_SUPPORT:
         return []
     try:
-        return session_manager.list_sessions(limit=limit)
+        return Response(await recent_sessions_body(limit), media_type="application/json")
     except Exception as e:
         return []
 
@@ -824,6 +1044,7 @@ async def delete_session(session_id: str):
     try:
         success = session_manager.delete_session(session_id)
         if success:
+            invalidate_recent_sessions()
             return {"success": True, "message": "Session deleted successfully"}
         else:
             raise HTTPException(status_code=404, detail="Session not found")
@@ -832,20 +1053,25 @@ async def delete_session(session_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=sanitize_error(e))
 
-@app.post("/api/export")
-async def export_history(request: ExportRequest):
+@app.post("/api/export", openapi_extra=_json_body_openapi(ExportRequest))
+async def export_history(request: ExportRequest = _json_body(ExportRequest)):
     """Export chat history to specified format"""
     try:
-        file_path = export_chat(
+        file_path = await run_in_threadpool(
+            export_chat,
             chat_history=request.chat_history,
             format=request.format,
             output_dir='./exports'
         )
         
+        # The stat we already have saves FileResponse its own; the report is
+        # single-use, so it is removed once the download has been sent
         return FileResponse(
             path=file_path,
             filename=os.path.basename(file_path),
-            media_type='application/octet-stream'
+            media_type='application/octet-stream',
+            stat_result=os.stat(file_path),
+            background=BackgroundTask(os.remove, file_path)
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=sanitize_error(e))
@@ -863,10 +1089,25 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Register agent-space routes (tool execution, capabilities)
 try:
-    from api.routes.agent_space import router as agent_space_router
+    from api.routes.agent_space import (
+        router as agent_space_router, tool_execution_error_handler
+    )
     app.include_router(agent_space_router)
+    # Tool failures propagate from execute_tool; sanitized here instead of per route
+    app.add_exception_handler(Exception, tool_execution_error_handler)
 except ImportError as e:
     print(f"Warning: Agent space routes not available: {e}")
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    # loop/http "auto" pick uvloop + httptools when installed (uvicorn[standard]),
+    # and fall back to asyncio + h11 on platforms without them (e.g. Windows);
+    # API_LOOP=uvloop / API_HTTP=httptools make a missing extra fail loudly instead
+    uvicorn.run(
+        "api_server:app" if API_WORKERS > 1 else app,
+        host="127.0.0.1",
+        port=8000,
+        workers=API_WORKERS,
+        loop=os.getenv("API_LOOP", "auto"),
+        http=os.getenv("API_HTTP", "auto"),
+        limit_concurrency=1000
+    )
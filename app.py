@@ -5,9 +5,11 @@ os.environ["TRANSFORMERS_NO_TF"] = "1"
 import streamlit as st
 from main_engine import Orchestrator
 from llm_client import LLMClient
-from vector_store import VectorStore
+from vector_store import VectorStore, VECTOR_STORE_OPTIONS
 from ingestion import DocumentProcessor
 from pathlib import Path
+import hashlib
+import threading
 
 st.set_page_config(
     page_title="Agentic Research Assistant",
@@ -15,6 +17,70 @@ st.set_page_config(
     layout="wide"
 )
 
+# Model wrappers hold no per-user data, so unlike the stores below they are
+# safe to share across sessions and are loaded once per process
+@st.cache_resource(show_spinner=False)
+def load_image_captioner():
+    try:
+        from image_captioner import ImageCaptioner
+        return ImageCaptioner()
+    except Exception as e:
+        print(f"Warning: Could not load image captioner: {e}")
+        return None
+
+
+@st.cache_resource(show_spinner=False)
+def load_voice_transcriber():
+    try:
+        from voice_transcriber import VoiceTranscriber
+        return VoiceTranscriber(model_size="tiny")
+    except Exception as e:
+        print(f"Warning: Could not load voice transcriber: {e}")
+        return None
+
+
+# Once per process, after the first session has built its stores: pull in the
+# audio stack (torch/whisper) and run one embedding so the first audio upload
+# and first query don't pay for imports and lazy model initialization
+@st.cache_resource(show_spinner=False)
+def start_preload(_vector_store) -> threading.Thread:
+    def preload():
+        try:
+            import voice_transcriber  # noqa: F401
+            import whisper  # noqa: F401
+        except Exception as e:
+            print(f"Warning: Could not preload audio modules: {e}")
+        try:
+            _vector_store.embed(["warmup"])
+        except Exception as e:
+            print(f"Warning: Could not warm up embedding model: {e}")
+    
+    thread = threading.Thread(target=preload, name="preload", daemon=True)
+    thread.start()
+    return thread
+
+
+# Health probes are shared by all sessions and reruns: each server is asked at most
+# once per ttl instead of on every widget interaction. Keyed on the URL only;
+# the leading underscore keeps Streamlit from hashing the bound method
+@st.cache_data(ttl=10, show_spinner=False)
+def cached_health(url: str, _check) -> bool:
+    return _check()
+
+
+def save_uploaded_file(uploaded_file, path: str) -> str:
+    """Write an upload to disk and return its short content hash.
+    
+    getbuffer() is a view of the upload's memory, so neither the write nor the
+    hash needs the full bytes copy that getvalue() makes. SHA-256 (hardware
+    accelerated via OpenSSL) matches the ids the API's upload endpoints assign.
+    """
+    with uploaded_file.getbuffer() as data:
+        with open(path, "wb") as f:
+            f.write(data)
+        return hashlib.sha256(data).hexdigest()[:8]
+
+
 # BUG-027 FIX: Remove @st.cache_resource to prevent data leak between users
 # Use session_state for per-user isolation
 def initialize_system():
@@ -29,15 +95,10 @@ def initialize_system():
     
     # Initialize fresh for this user session
     llm_client = LLMClient(base_url="http://127.0.0.1:8080")
-    vector_store = VectorStore(persist_directory="./faiss_db")
+    vector_store = VectorStore(persist_directory="./faiss_db", **VECTOR_STORE_OPTIONS)
     processor = DocumentProcessor(vector_store, chunk_size=800, chunk_overlap=160)
     
-    try:
-        from image_captioner import ImageCaptioner
-        image_captioner = ImageCaptioner()
-    except Exception as e:
-        print(f"Warning: Could not load image captioner: {e}")
-        image_captioner = None
+    image_captioner = load_image_captioner()
     
     orchestrator = Orchestrator(
         llm_client=llm_client,
@@ -62,25 +123,25 @@ if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 
 llm_client, vector_store, processor, orchestrator = initialize_system()
+start_preload(vector_store)
 
 with st.sidebar:
     st.header("System Status")
     
-    server_healthy = llm_client.health_check()
+    server_healthy = cached_health(llm_client.base_url, llm_client.health_check)
     if server_healthy:
         st.success("LLM Server: Online")
     else:
         st.error("LLM Server: Offline")
         st.warning("Please start the model server first!")
     
-    multimodal_healthy = llm_client.multimodal_health_check()
+    multimodal_healthy = cached_health(llm_client.multimodal_base_url, llm_client.multimodal_health_check)
     if multimodal_healthy:
         st.success("Multimodal Server: Online")
     else:
         st.info("Multimodal Server: Offline (using caption fallback)")
     
-    doc_count = vector_store.get_collection_count()
-    st.info(f"Documents in KB: {doc_count}")
+    st.info(f"Documents in KB: {vector_store.document_count} ({vector_store.chunk_count} chunks)")
     
     st.markdown("---")
     st.header("Knowledge Base Management")
@@ -90,7 +151,7 @@ with st.sidebar:
         if os.path.exists("./faiss_db"):
             shutil.rmtree("./faiss_db")
         # Re-init vector store, processor and orchestrator to prevent stale references
-        new_vs = VectorStore(persist_directory="./faiss_db")
+        new_vs = VectorStore(persist_directory="./faiss_db", **VECTOR_STORE_OPTIONS)
         new_proc = DocumentProcessor(new_vs, chunk_size=800, chunk_overlap=160)
         st.session_state.vector_store = new_vs
         st.session_state.processor = new_proc
@@ -117,8 +178,7 @@ with st.sidebar:
                     temp_path = f"./data/{uploaded_file.name}"
                     os.makedirs("./data", exist_ok=True)
                     
-                    with open(temp_path, "wb") as f:
-                        f.write(uploaded_file.getvalue())
+                    save_uploaded_file(uploaded_file, temp_path)
                     
                     try:
                         result = processor.process_pdf(temp_path)
@@ -128,89 +188,95 @@ with st.sidebar:
                         st.error(f"Error: {e}")
     
     elif upload_type == "Image":
-        uploaded_image = st.file_uploader(
-            "Upload Image",
+        uploaded_images = st.file_uploader(
+            "Upload Images",
             type=['png', 'jpg', 'jpeg'],
-            help="Upload an image to add to knowledge base with caption"
+            accept_multiple_files=True,
+            help="Upload one or more images to add to knowledge base with captions"
         )
         
-        if uploaded_image is not None:
-            st.image(uploaded_image, caption="Uploaded Image", use_container_width=True)
+        if uploaded_images:
+            for uploaded_image in uploaded_images:
+                st.image(uploaded_image, caption=uploaded_image.name, use_container_width=True)
             
-            if st.button("Process Image"):
-                with st.spinner("Captioning image..."):
+            if st.button("Process Images"):
+                with st.spinner("Captioning images..."):
                     os.makedirs("./data", exist_ok=True)
-                    img_path = f"./data/{uploaded_image.name}"
-                    
-                    with open(img_path, "wb") as f:
-                        f.write(uploaded_image.getvalue())
                     
                     try:
-                        from image_captioner import ImageCaptioner
-                        captioner = ImageCaptioner()
-                        caption = captioner.caption_image(img_path)
-                        
-                        text_with_caption = f"Image: {uploaded_image.name}\nCaption: {caption}"
+                        captioner = load_image_captioner()
+                        if captioner is None:
+                            raise RuntimeError("Image captioner not available")
                         
-                        import hashlib
-                        file_hash = hashlib.md5(uploaded_image.getvalue()).hexdigest()[:8]
-                        
-                        metadata = {
-                            "source": img_path,
-                            "page": 0,
-                            "chunk_index": 0,
-                            "file_hash": file_hash,
-                            "images": img_path
-                        }
+                        texts, metadatas, ids = [], [], []
+                        for uploaded_image in uploaded_images:
+                            img_path = f"./data/{uploaded_image.name}"
+                            file_hash = save_uploaded_file(uploaded_image, img_path)
+                            caption = captioner.caption_image(img_path)
+                            
+                            texts.append(f"Image: {uploaded_image.name}\nCaption: {caption}")
+                            metadatas.append({
+                                "source": img_path,
+                                "page": 0,
+                                "chunk_index": 0,
+                                "file_hash": file_hash,
+                                "images": img_path
+                            })
+                            ids.append(file_hash)
                         
-                        vector_store.add_documents([text_with_caption], [metadata], [file_hash])
+                        # One call embeds the batch together and saves the index once
+                        vector_store.add_documents(texts, metadatas, ids)
                         
-                        st.success(f"Image processed and added with caption: {caption[:100]}...")
+                        st.success(f"{len(texts)} image(s) processed and added with captions")
                         st.rerun()
                     except Exception as e:
                         st.error(f"Error: {e}")
     
     elif upload_type == "Voice":
-        uploaded_audio = st.file_uploader(
+        uploaded_audios = st.file_uploader(
             "Upload Audio",
             type=['wav', 'mp3', 'm4a', 'ogg'],
-            help="Upload audio file to transcribe and store in knowledge base"
+            accept_multiple_files=True,
+            help="Upload one or more audio files to transcribe and store in knowledge base"
         )
         
-        if uploaded_audio is not None:
+        if uploaded_audios:
             if st.button("Transcribe & Save to KB"):
                 with st.spinner("Transcribing audio..."):
                     os.makedirs("./data", exist_ok=True)
-                    audio_path = f"./data/{uploaded_audio.name}"
-                    
-                    with open(audio_path, "wb") as f:
-                        f.write(uploaded_audio.getvalue())
                     
                     try:
-                        from voice_transcriber import VoiceTranscriber
-                        transcriber = VoiceTranscriber(model_size="tiny")
-                        transcription = transcriber.transcribe(audio_path)
+                        transcriber = load_voice_transcriber()
+                        if transcriber is None:
+                            raise RuntimeError("Voice transcriber not available")
                         
-                        if transcription and not transcription.startswith("Error"):
-                            text_with_transcription = f"Audio: {uploaded_audio.name}\nTranscription: {transcription}"
+                        texts, metadatas, ids, errors = [], [], [], []
+                        for uploaded_audio in uploaded_audios:
+                            audio_path = f"./data/{uploaded_audio.name}"
+                            file_hash = save_uploaded_file(uploaded_audio, audio_path)
+                            transcription = transcriber.transcribe(audio_path)
                             
-                            import hashlib
-                            file_hash = hashlib.md5(uploaded_audio.getvalue()).hexdigest()[:8]
-                            
-                            metadata = {
+                            if not transcription or transcription.startswith("Error"):
+                                errors.append(f"{uploaded_audio.name}: {transcription}")
+                                continue
+                            texts.append(f"Audio: {uploaded_audio.name}\nTranscription: {transcription}")
+                            metadatas.append({
                                 "source": audio_path,
                                 "page": 0,
                                 "chunk_index": 0,
                                 "file_hash": file_hash,
                                 "images": ""
-                            }
-                            
-                            vector_store.add_documents([text_with_transcription], [metadata], [file_hash])
-                            
-                            st.success(f"Audio transcribed and saved to KB: {transcription[:100]}...")
+                            })
+                            ids.append(file_hash)
+                        
+                        if texts:
+                            # One call embeds the batch together and saves the index once
+                            vector_store.add_documents(texts, metadatas, ids)
+                            st.success(f"{len(texts)} audio file(s) transcribed and saved to KB")
+                        for error in errors:
+                            st.error(error)
+                        if texts and not errors:
                             st.rerun()
-                        else:
-                            st.error(transcription)
                     except Exception as e:
                         st.error(f"Error: {e}")
     
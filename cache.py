@@ -1,47 +1,108 @@
 import sqlite3
 import hashlib
-import json
+import orjson
 import time
 import os
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+import threading
+import functools
+import atexit
+import queue
+import numpy as np
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+# Cosine similarity above which a paraphrased query reuses a cached response;
+# SEMANTIC_CACHE=0 turns paraphrase hits off (exact-match caching is unaffected)
+SEMANTIC_THRESHOLD = 0.93
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "1") == "1"
+# UPDATE ... RETURNING needs SQLite 3.35+
+SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+# Most recently used responses kept in memory in front of SQLite (0 disables)
+CACHE_L1_SIZE = int(os.getenv("CACHE_L1_SIZE", "512"))
+# Queued set() rows committed by the writer thread per transaction
+CACHE_WRITE_BATCH = 64
+
+@functools.lru_cache(maxsize=1024)
+def _query_hash(user_query: str) -> str:
+    # A query is hashed by get() and again by set() on a miss; memoize the pair
+    # str.strip() for both paths: bytes.strip() would miss whitespace such as \x1c-\x1f
+    stripped = user_query.strip()
+    if stripped.isascii():
+        # ASCII: lowercase the encoded bytes directly instead of building another str
+        normalized = stripped.encode().lower()
+    else:
+        normalized = stripped.lower().encode()
+    return hashlib.sha256(normalized).hexdigest()
 
 class ResponseCache:
     """SQLite-based cache for RAG responses with intelligent invalidation"""
     
     def __init__(self, db_path: str = "./cache/responses.db"):
         self.db_path = db_path
+        # Normalized embeddings of cached queries (current KB state), built lazily.
+        # Rows [:len(_semantic_hashes)] are live; spare capacity absorbs set() appends
+        self._semantic_keys: Optional[np.ndarray] = None
+        self._semantic_hashes: List[str] = []
+        self._semantic_known: set = set()
+        self._semantic_lock = threading.Lock()
+        # One long-lived connection shared by all threads, one statement batch at a time
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        # (vector store, its version, kb hash) from the last computation
+        self._kb_hash_memo = (None, -1, "")
+        # L1: query_hash -> (kb_hash, expires_at epoch, serialized response), LRU order.
+        # Hits served here skip SQLite, so they do not bump access_count
+        self._l1: "OrderedDict[str, tuple]" = OrderedDict()
+        self._l1_lock = threading.Lock()
+        self._l1_hits = 0
+        # set() returns once the row is queued (and in L1); a writer thread commits in batches.
+        # Clearing bumps _write_gen so rows queued before it are dropped, not resurrected
+        self._write_q: "queue.Queue[tuple]" = queue.Queue()
+        self._write_gen = 0
         self._ensure_db()
+        threading.Thread(target=self._writer, name="cache-writer", daemon=True).start()
+        atexit.register(self.flush)
     
-    def _ensure_db(self):
-        """Ensure the cache DB file and schema exist (handles manual deletions)."""
-        db_exists = os.path.exists(self.db_path)
-        if not db_exists:
-            self._init_db()
-            return
+    def _ensure_db(self) -> sqlite3.Connection:
+        """Return the shared connection, recreating the DB file and schema if it was deleted."""
+        conn = self._conn
+        if conn is not None and os.path.exists(self.db_path):
+            return conn
+        with self._db_lock:
+            if self._conn is not None:
+                if os.path.exists(self.db_path):
+                    return self._conn
+                self._conn.close()
+                self._conn = None
+                self._clear_l1()
+            self._conn = self._init_db()
+            return self._conn
 
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    "SELECT name FROM sqlite_master WHERE type='table' AND name='cached_responses'"
-                )
-                if cursor.fetchone() is None:
-                    self._init_db()
-        except sqlite3.OperationalError:
-            self._init_db()
+    @contextmanager
+    def _connection(self):
+        """Shared connection for one block of statements; commits on success like `with conn`"""
+        conn = self._ensure_db()
+        with self._db_lock, conn:
+            yield conn
 
-    def _init_db(self):
-        """Initialize SQLite database with proper schema"""
+    def _init_db(self) -> sqlite3.Connection:
+        """Open the database and ensure the schema exists (caller holds _db_lock)"""
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("PRAGMA journal_mode=WAL")
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        # WAL + synchronous=NORMAL: commits append to the log without an fsync each
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        with conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS cached_responses (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     query_hash TEXT UNIQUE NOT NULL,
                     user_query TEXT NOT NULL,
-                    response_data TEXT NOT NULL,  -- JSON serialized response
+                    response_data BLOB NOT NULL,  -- JSON serialized response
                     kb_hash TEXT NOT NULL,        -- Hash of knowledge base state
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -64,18 +125,23 @@ class ResponseCache:
                 CREATE INDEX IF NOT EXISTS idx_created_at 
                 ON cached_responses(created_at)
             """)
-            
-            conn.commit()
+        return conn
     
     def _generate_query_hash(self, user_query: str) -> str:
         """Generate consistent hash for query"""
-        normalized_query = user_query.strip().lower()
-        return hashlib.sha256(normalized_query.encode()).hexdigest()
+        return _query_hash(user_query)
     
     def set_vector_store(self, vector_store):
         """Set the vector store reference to avoid re-creating it on every call"""
         self._vector_store = vector_store
 
+    @staticmethod
+    def _count_sources(vs) -> int:
+        # VectorStore keeps a per-source refcount; avoid building a set over every chunk
+        if hasattr(vs, 'document_count'):
+            return vs.document_count
+        return len(set(meta.get('source', '') for meta in vs.metadatas))
+    
     def _generate_kb_hash(self, vector_store=None) -> str:
         """Generate hash representing current knowledge base state (thread-safe)"""
         try:
@@ -96,78 +162,183 @@ class ResponseCache:
                 except Exception:
                     return hashlib.md5("fallback_kb_state".encode()).hexdigest()
             
+            # Steady state: the store has not been written since the last call
+            memo_vs, memo_version, memo_hash = self._kb_hash_memo
+            version = getattr(vs, 'version', None)
+            if memo_vs is vs and version is not None and memo_version == version:
+                return memo_hash
+            
             # THREAD-SAFETY FIX: Acquire lock before reading vector store state
             lock = getattr(vs, '_lock', None)
             if lock:
                 with lock:
-                    doc_count = len(set(meta.get('source', '') for meta in vs.metadatas))
+                    version = getattr(vs, 'version', None)
+                    doc_count = self._count_sources(vs)
                     chunk_count = len(vs.documents)
                     id_count = len(vs.ids)
             else:
-                doc_count = len(set(meta.get('source', '') for meta in vs.metadatas))
+                doc_count = self._count_sources(vs)
                 chunk_count = len(vs.documents)
                 id_count = len(vs.ids)
             
             kb_state = f"{doc_count}_{chunk_count}_{id_count}"
-            return hashlib.md5(kb_state.encode()).hexdigest()
+            kb_hash = hashlib.md5(kb_state.encode()).hexdigest()
+            if version is not None:
+                self._kb_hash_memo = (vs, version, kb_hash)
+            return kb_hash
         except Exception:
             # Fallback if vector store not available
             return hashlib.md5("fallback_kb_state".encode()).hexdigest()
     
     def get(self, user_query: str) -> Optional[Dict[str, Any]]:
         """Retrieve cached response if valid and not expired"""
-        self._ensure_db()
-        query_hash = self._generate_query_hash(user_query)
+        return self._get_by_hash(self._generate_query_hash(user_query))
+    
+    def _l1_get(self, query_hash: str, kb_hash: str) -> Optional[bytes]:
+        with self._l1_lock:
+            entry = self._l1.get(query_hash)
+            if entry is None:
+                return None
+            if entry[0] == kb_hash and time.time() < entry[1]:
+                self._l1.move_to_end(query_hash)
+                self._l1_hits += 1
+                return entry[2]
+            del self._l1[query_hash]
+            return None
+    
+    def _l1_put(self, query_hash: str, kb_hash: str, expires_at: float, data):
+        if CACHE_L1_SIZE <= 0:
+            return
+        with self._l1_lock:
+            self._l1[query_hash] = (kb_hash, expires_at, data)
+            self._l1.move_to_end(query_hash)
+            while len(self._l1) > CACHE_L1_SIZE:
+                self._l1.popitem(last=False)
+    
+    def _clear_l1(self):
+        with self._l1_lock:
+            self._l1.clear()
+    
+    def _get_by_hash(self, query_hash: str) -> Optional[Dict[str, Any]]:
+        self._ensure_db()  # drops L1 too if the DB file was deleted
         current_kb_hash = self._generate_kb_hash()
+        # L1 holds bytes, so every caller still gets its own (mutable) dict
+        data = self._l1_get(query_hash, current_kb_hash)
+        if data is not None:
+            return orjson.loads(data)
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT response_data, created_at, ttl_hours, access_count
-                FROM cached_responses 
-                WHERE query_hash = ? AND kb_hash = ?
-            """, (query_hash, current_kb_hash))
-            
-            row = cursor.fetchone()
-            
-            if not row:
-                return None
-            
-            response_data, created_at, ttl_hours, access_count = row
-            
-            # Check if expired - use naive datetime comparison
+        # Expiry is checked by SQLite in UTC (the clock CURRENT_TIMESTAMP used at insert);
+        # expired rows are not deleted here but left to cleanup_expired()
+        live = """
+            WHERE query_hash = ? AND kb_hash = ?
+            AND created_at > datetime('now', '-' || ttl_hours || ' hours')
+        """
+        expires_at = "CAST(strftime('%s', created_at) AS INTEGER) + ttl_hours * 3600"
+        
+        with self._connection() as conn:
+            if SQLITE_HAS_RETURNING:
+                # One statement both checks the entry and records the hit
+                rows = conn.execute(f"""
+                    UPDATE cached_responses 
+                    SET last_accessed = CURRENT_TIMESTAMP, access_count = access_count + 1
+                    {live}
+                    RETURNING response_data, {expires_at}
+                """, (query_hash, current_kb_hash)).fetchall()
+            else:
+                rows = conn.execute(f"SELECT response_data, {expires_at} FROM cached_responses {live}",
+                                    (query_hash, current_kb_hash)).fetchall()
+                if rows:
+                    conn.execute("""
+                        UPDATE cached_responses 
+                        SET last_accessed = CURRENT_TIMESTAMP, access_count = access_count + 1
+                        WHERE query_hash = ?
+                    """, (query_hash,))
+        
+        if not rows:
+            return None
+        data, expires = rows[0]
+        self._l1_put(query_hash, current_kb_hash, expires, data)
+        return orjson.loads(data)
+    
+    def _writer(self):
+        while True:
+            batch = [self._write_q.get()]
+            while len(batch) < CACHE_WRITE_BATCH:
+                try:
+                    batch.append(self._write_q.get_nowait())
+                except queue.Empty:
+                    break
             try:
-                # Handle various datetime formats from SQLite
-                created_at_clean = created_at.replace('Z', '').replace('+00:00', '')
-                created_time = datetime.fromisoformat(created_at_clean)
-            except ValueError:
-                # Fallback: treat as expired if can't parse
-                cursor.execute("DELETE FROM cached_responses WHERE query_hash = ?", (query_hash,))
-                conn.commit()
-                return None
-            
-            expiry_time = created_time + timedelta(hours=ttl_hours)
-            
-            if datetime.now() > expiry_time:
-                # Delete expired entry
-                cursor.execute("DELETE FROM cached_responses WHERE query_hash = ?", (query_hash,))
-                conn.commit()
-                return None
-            
-            # Update access statistics
-            cursor.execute("""
-                UPDATE cached_responses 
-                SET last_accessed = CURRENT_TIMESTAMP, access_count = access_count + 1
-                WHERE query_hash = ?
-            """, (query_hash,))
-            conn.commit()
-            
-            return json.loads(response_data)
+                with self._connection() as conn:
+                    rows = [row for gen, row in batch if gen == self._write_gen]
+                    conn.executemany("""
+                        INSERT OR REPLACE INTO cached_responses 
+                        (query_hash, user_query, response_data, kb_hash, ttl_hours)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, rows)
+            except Exception as e:
+                print(f"⚠️ Cache: Failed to write {len(batch)} entries: {e}")
+            finally:
+                for _ in batch:
+                    self._write_q.task_done()
+    
+    def flush(self):
+        """Block until every queued set() is committed"""
+        self._write_q.join()
+    
+    def _load_semantic_index(self, vs):
+        """Embed the cached queries for the current KB state in one batch"""
+        self.flush()
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT query_hash, user_query FROM cached_responses WHERE kb_hash = ?",
+                (self._generate_kb_hash(),)
+            ).fetchall()
+        self._semantic_hashes = [query_hash for query_hash, _ in rows]
+        self._semantic_known = set(self._semantic_hashes)
+        self._semantic_keys = np.empty((max(64, 2 * len(rows)), vs.dimension), dtype=np.float32)
+        if rows:
+            self._semantic_keys[:len(rows)] = vs.embed([query for _, query in rows])
+    
+    def _reset_semantic_index(self):
+        with self._semantic_lock:
+            self._semantic_keys = None
+            self._semantic_hashes = []
+            self._semantic_known = set()
+    
+    def semantic_lookup(self, user_query: str, threshold: float = SEMANTIC_THRESHOLD,
+                        query_embedding: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+        """Return the cached response of the most similar prior query, if similar enough.
+        
+        Pass query_embedding (a row of VectorStore.embed) to skip embedding the query here.
+        A hit carries cache_match = {"type": "semantic", "similarity": ...} for auditing.
+        """
+        vs = getattr(self, '_vector_store', None)
+        if vs is None or not SEMANTIC_CACHE_ENABLED:
+            return None
+        
+        with self._semantic_lock:
+            if self._semantic_keys is None:
+                self._load_semantic_index(vs)
+            hashes = self._semantic_hashes
+            keys = self._semantic_keys[:len(hashes)]
+        if not hashes:
+            return None
+        
+        if query_embedding is None:
+            query_embedding = vs.embed([user_query])[0]
+        # One BLAS matrix-vector product scores every cached query
+        similarities = keys @ query_embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < threshold:
+            return None
+        response = self._get_by_hash(hashes[best])
+        if response is not None:
+            response['cache_match'] = {"type": "semantic", "similarity": float(similarities[best])}
+        return response
     
     def set(self, user_query: str, response_data: Dict[str, Any], ttl_hours: int = 24):
         """Cache a successful response"""
-        self._ensure_db()
         query_hash = self._generate_query_hash(user_query)
         kb_hash = self._generate_kb_hash()
         
@@ -178,25 +349,33 @@ class ResponseCache:
         # Strip execution_log and other non-essential/large fields before caching
         cacheable_data = {k: v for k, v in response_data.items() if k != 'execution_log'}
         
-        with sqlite3.connect(self.db_path) as conn:
-            try:
-                serialized = json.dumps(cacheable_data, default=str)
-            except (TypeError, ValueError) as e:
-                print(f"⚠️ Cache: Failed to serialize response: {e}")
-                return
-            
-            conn.execute("""
-                INSERT OR REPLACE INTO cached_responses 
-                (query_hash, user_query, response_data, kb_hash, ttl_hours)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                query_hash,
-                user_query,
-                serialized,
-                kb_hash,
-                ttl_hours
-            ))
-            conn.commit()
+        try:
+            # Stored as bytes; rows written as TEXT by older versions still load
+            serialized = orjson.dumps(cacheable_data, default=str,
+                                      option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Cache: Failed to serialize response: {e}")
+            return
+        
+        self._ensure_db()
+        with self._db_lock:
+            # Under the DB lock, so a concurrent clear either precedes both or drops both
+            self._l1_put(query_hash, kb_hash, time.time() + ttl_hours * 3600, serialized)
+            self._write_q.put((self._write_gen, (query_hash, user_query, serialized, kb_hash, ttl_hours)))
+        
+        vs = getattr(self, '_vector_store', None)
+        if vs is not None:
+            with self._semantic_lock:
+                if self._semantic_keys is not None and query_hash not in self._semantic_known:
+                    size = len(self._semantic_hashes)
+                    if size == len(self._semantic_keys):
+                        # Grow geometrically; lookups keep slicing whichever buffer they read
+                        grown = np.empty((2 * size, self._semantic_keys.shape[1]), dtype=np.float32)
+                        grown[:size] = self._semantic_keys
+                        self._semantic_keys = grown
+                    self._semantic_keys[size] = vs.embed([user_query])[0]
+                    self._semantic_hashes.append(query_hash)
+                    self._semantic_known.add(query_hash)
     
     def invalidate_by_kb(self):
         """Invalidate cached responses whose KB hash no longer matches current state.
@@ -204,60 +383,57 @@ class ResponseCache:
         This is granular: entries cached against the *current* KB state survive,
         so only stale entries (from a previous KB state) are removed.
         """
-        self._ensure_db()
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Get current KB hash
-            current_kb_hash = self._generate_kb_hash()
-            
+        # Queued rows from the current KB state must survive; stale ones are deleted with the rest
+        self.flush()
+        # Get current KB hash
+        current_kb_hash = self._generate_kb_hash()
+        
+        with self._connection() as conn:
             # Delete all entries with different KB hash (stale entries)
-            cursor.execute("""
+            deleted_count = conn.execute("""
                 DELETE FROM cached_responses 
                 WHERE kb_hash != ?
-            """, (current_kb_hash,))
-            
-            deleted_count = cursor.rowcount
-            conn.commit()
-            
-            if deleted_count > 0:
-                print(f"🗑️ Cache: Invalidated {deleted_count} stale entries (KB changed)")
-            return deleted_count
+            """, (current_kb_hash,)).rowcount
+        self._reset_semantic_index()
+        self._clear_l1()
+        
+        if deleted_count > 0:
+            print(f"🗑️ Cache: Invalidated {deleted_count} stale entries (KB changed)")
+        return deleted_count
     
     def invalidate_by_query_substring(self, substring: str):
         """Invalidate cached responses whose original query contains the given substring.
         
         Useful for targeted invalidation when a specific document is deleted.
         """
-        self._ensure_db()
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
+        self.flush()
+        with self._connection() as conn:
+            deleted_count = conn.execute("""
                 DELETE FROM cached_responses
                 WHERE user_query LIKE ?
-            """, (f"%{substring}%",))
-            deleted_count = cursor.rowcount
-            conn.commit()
-            if deleted_count > 0:
-                print(f"🗑️ Cache: Invalidated {deleted_count} entries matching '{substring}'")
-            return deleted_count
+            """, (f"%{substring}%",)).rowcount
+            self._write_gen += 1
+        self._reset_semantic_index()
+        self._clear_l1()
+        if deleted_count > 0:
+            print(f"🗑️ Cache: Invalidated {deleted_count} entries matching '{substring}'")
+        return deleted_count
     
     def clear_all(self):
         """Clear all cached responses"""
-        self._ensure_db()
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM cached_responses")
-            deleted_count = cursor.rowcount
-            conn.commit()
-            
-            print(f"🗑️ Cache: Cleared all {deleted_count} entries")
-            return deleted_count
+        with self._connection() as conn:
+            deleted_count = conn.execute("DELETE FROM cached_responses").rowcount
+            self._write_gen += 1
+        self._reset_semantic_index()
+        self._clear_l1()
+        
+        print(f"🗑️ Cache: Cleared all {deleted_count} entries")
+        return deleted_count
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
-        self._ensure_db()
-        with sqlite3.connect(self.db_path) as conn:
+        self.flush()
+        with self._connection() as conn:
             cursor = conn.cursor()
             
             # Total entries
@@ -281,27 +457,24 @@ class ResponseCache:
                 "reused_entries": reused_entries,
                 "reuse_rate": (reused_entries / total_entries * 100) if total_entries > 0 else 0,
                 "avg_access_count": round(avg_access, 2),
-                "oldest_entry": oldest
+                "oldest_entry": oldest,
+                "memory_hits": self._l1_hits
             }
     
     def cleanup_expired(self):
         """Remove expired entries"""
-        self._ensure_db()
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+        with self._connection() as conn:
+            deleted_count = conn.execute("""
                 DELETE FROM cached_responses 
                 WHERE created_at < datetime('now', '-' || ttl_hours || ' hours')
-            """)
-            
-            deleted_count = cursor.rowcount
-            conn.commit()
-            
-            if deleted_count > 0:
-                print(f"🗑️ Cache: Cleaned up {deleted_count} expired entries")
-            
-            return deleted_count
+            """).rowcount
+        self._reset_semantic_index()
+        self._clear_l1()
+        
+        if deleted_count > 0:
+            print(f"🗑️ Cache: Cleaned up {deleted_count} expired entries")
+        
+        return deleted_count
 
 # Global cache instance
 _cache_instance = None
@@ -311,4 +484,6 @@ def get_cache() -> ResponseCache:
     global _cache_instance
     if _cache_instance is None:
         _cache_instance = ResponseCache()
+        # Lookups skip expired rows without deleting them; sweep them once per process
+        _cache_instance.cleanup_expired()
     return _cache_instance
@@ -3,9 +3,16 @@ Application Settings
 Central configuration for the Agentic Research Assistant
 """
 import os
+import functools
 import yaml
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any
+
+try:
+    from yaml import CSafeLoader as SafeLoader  # libyaml-backed parser
+except ImportError:
+    from yaml import SafeLoader
 
 BASE_DIR = Path(__file__).parent.parent
 CONFIG_DIR = BASE_DIR / "config"
@@ -15,57 +22,59 @@ EXPORTS_DIR = BASE_DIR / "exports"
 STATIC_DIR = BASE_DIR / "static"
 
 
+@functools.lru_cache(maxsize=8)
+def _load_yaml_cached(path: str, mtime: float) -> Dict[str, Any]:
+    with open(path, 'r') as f:
+        return yaml.load(f, Loader=SafeLoader) or {}
+
+
+def _load_yaml(path: Path) -> Dict[str, Any]:
+    """Parse a YAML file once per modification time; missing files read as {}"""
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return {}
+    return _load_yaml_cached(str(path), mtime)
+
+
+def _env(name: str, default: str):
+    return field(default_factory=lambda: os.getenv(name, default))
+
+
+@dataclass(frozen=True, slots=True)
 class Settings:
-    """Application settings manager"""
+    """Application settings (immutable once built; environment read at construction)"""
+    
+    base_dir: Path = BASE_DIR
+    config_dir: Path = CONFIG_DIR
+    data_dir: Path = DATA_DIR
+    workspace_dir: Path = WORKSPACE_DIR
+    exports_dir: Path = EXPORTS_DIR
+    static_dir: Path = STATIC_DIR
+    
+    llm_server_url: str = _env("LLM_SERVER_URL", "http://127.0.0.1:8080")
+    api_server_host: str = _env("API_HOST", "127.0.0.1")
+    api_server_port: int = field(default_factory=lambda: int(os.getenv("API_PORT", "8000")))
+    
+    database_url: str = _env("DATABASE_URL", f"sqlite:///{DATA_DIR}/assistant.db")
+    
+    embedding_model: str = _env("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    vector_db_path: Path = DATA_DIR / "faiss_db"
     
-    def __init__(self):
-        self.base_dir = BASE_DIR
-        self.config_dir = CONFIG_DIR
-        self.data_dir = DATA_DIR
-        self.workspace_dir = WORKSPACE_DIR
-        self.exports_dir = EXPORTS_DIR
-        self.static_dir = STATIC_DIR
-        
-        self.llm_server_url = os.getenv("LLM_SERVER_URL", "http://127.0.0.1:8080")
-        self.api_server_host = os.getenv("API_HOST", "127.0.0.1")
-        self.api_server_port = int(os.getenv("API_PORT", "8000"))
-        
-        self.database_url = os.getenv("DATABASE_URL", f"sqlite:///{DATA_DIR}/assistant.db")
-        
-        self.embedding_model = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
-        self.vector_db_path = DATA_DIR / "faiss_db"
-        
-        self.max_context_length = 4096
-        self.confidence_threshold = 0.7
-        self.max_refinements = 3
-        self.top_k_retrieval = 10
-        
-        self._capabilities: Optional[Dict] = None
-        self._rules: Optional[Dict] = None
+    max_context_length: int = 4096
+    confidence_threshold: float = 0.7
+    max_refinements: int = 3
+    top_k_retrieval: int = 10
     
     @property
     def capabilities(self) -> Dict[str, Any]:
-        """Load capabilities from YAML"""
-        if self._capabilities is None:
-            caps_file = self.config_dir / "capabilities.yaml"
-            if caps_file.exists():
-                with open(caps_file, 'r') as f:
-                    self._capabilities = yaml.safe_load(f)
-            else:
-                self._capabilities = {}
-        return self._capabilities
+        """Load capabilities from YAML (re-read when the file changes)"""
+        return _load_yaml(self.config_dir / "capabilities.yaml")
     
     @property
     def rules(self) -> Dict[str, Any]:
-        """Load rules from YAML"""
-        if self._rules is None:
-            rules_file = self.config_dir / "agent_rules.yaml"
-            if rules_file.exists():
-                with open(rules_file, 'r') as f:
-                    self._rules = yaml.safe_load(f)
-            else:
-                self._rules = {}
-        return self._rules
+        """Load rules from YAML (re-read when the file changes)"""
+        return _load_yaml(self.config_dir / "agent_rules.yaml")
     
     def ensure_directories(self):
         """Create necessary directories"""
@@ -2,11 +2,20 @@
 Capability Registry
 Manages agent capabilities, permissions, and tool availability
 """
+import json
+import os
+import functools
 import yaml
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Mapping, Optional, Tuple
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
+from types import MappingProxyType
+
+try:
+    from yaml import CSafeLoader as SafeLoader  # libyaml-backed parser
+except ImportError:
+    from yaml import SafeLoader
 
 
 class CapabilityStatus(Enum):
@@ -15,19 +24,95 @@ class CapabilityStatus(Enum):
     RESTRICTED = "restricted"
 
 
-@dataclass
+_SIZE_UNITS = {"GB": 1 << 30, "MB": 1 << 20, "KB": 1 << 10}
+
+
+def _parse_size(size_str: str) -> int:
+    """Parse size string like '10MB' to bytes"""
+    size_str = str(size_str).strip()
+    multiplier = _SIZE_UNITS.get(size_str[-2:].upper())
+    return int(size_str[:-2]) * multiplier if multiplier else int(size_str)
+
+
+_TRIE_END = ""  # marks a configured module; never a real dotted-name component
+
+
+def _build_import_trie(modules: List[str]) -> Dict[str, Any]:
+    """Dict-of-dicts trie over dotted module names; 'pkg.*' is the same rule as 'pkg'"""
+    root: Dict[str, Any] = {}
+    for module in modules or ():
+        node = root
+        for part in module.removesuffix(".*").split("."):
+            node = node.setdefault(part, {})
+        node[_TRIE_END] = True
+    return root
+
+
+def _trie_covers(trie: Dict[str, Any], module: str) -> bool:
+    """True if the module or one of its parent packages is in the trie"""
+    node = trie
+    for part in module.split("."):
+        node = node.get(part)
+        if node is None:
+            return False
+        if _TRIE_END in node:
+            return True
+    return False
+
+
+def _load_capabilities_section(stream) -> Dict[str, Any]:
+    """Parse a YAML document but build Python objects only for its 'capabilities' key.
+    
+    The document is composed into a node tree (cheap: no Python objects per value);
+    sibling top-level sections are never constructed. Documents this shortcut cannot
+    represent faithfully (non-mapping root, top-level merge keys) are loaded in full.
+    """
+    loader = SafeLoader(stream)
+    try:
+        root = loader.get_single_node()
+        if root is None:
+            return {}
+        if not isinstance(root, yaml.MappingNode) or any(
+            key.tag == "tag:yaml.org,2002:merge" for key, _ in root.value
+        ):
+            return loader.construct_document(root)
+        config = {}
+        for key, value in root.value:
+            if isinstance(key, yaml.ScalarNode) and key.value == "capabilities":
+                config["capabilities"] = loader.construct_object(value, deep=True)
+        return config
+    finally:
+        loader.dispose()
+
+
+@dataclass(slots=True)
 class Capability:
     """Represents a single capability"""
     name: str
     category: str
     enabled: bool
     config: Dict[str, Any]
+    # Constraints parsed once from config; None when the config sets no such limit
+    max_file_size_bytes: Optional[int] = field(default=None, init=False)
+    timeout_seconds: Optional[float] = field(default=None, init=False)
+    allowed_extensions: Optional[frozenset] = field(default=None, init=False)
+    allowed_operations: Optional[frozenset] = field(default=None, init=False)
+    
+    def __post_init__(self):
+        if "max_file_size" in self.config:
+            self.max_file_size_bytes = _parse_size(self.config["max_file_size"])
+        if "timeout_seconds" in self.config:
+            self.timeout_seconds = self.config["timeout_seconds"]
+        if "allowed_extensions" in self.config:
+            self.allowed_extensions = frozenset(self.config["allowed_extensions"] or ())
+        if "allowed_operations" in self.config:
+            self.allowed_operations = frozenset(self.config["allowed_operations"] or ())
     
     def is_allowed(self, action: str = None) -> bool:
         if not self.enabled:
             return False
-        if action and "allowed_operations" in self.config:
-            return action in self.config["allowed_operations"]
+        if action and self.allowed_operations is not None:
+            return action in self.allowed_operations
         return True
 
 
@@ -36,16 +121,47 @@ class CapabilityRegistry:
     
     def __init__(self, config_path: Optional[Path] = None):
         self.capabilities: Dict[str, Dict[str, Capability]] = {}
+        # Flat (category, name) index and enabled keys in config order, for O(1) lookups
+        self._flat: Dict[Tuple[str, str], Capability] = {}
+        self._enabled_keys: Tuple[Tuple[str, str], ...] = ()
+        self._prompt_cache: Optional[str] = None
+        self._allowed_imports_trie: Dict[str, Any] = {}
+        self._blocked_imports_trie: Dict[str, Any] = {}
         self._config_path = config_path
         self._raw_config: Dict = {}
         
         if config_path and config_path.exists():
             self.load_from_yaml(config_path)
     
+    @classmethod
+    def get(cls, config_path: Path) -> "CapabilityRegistry":
+        """Shared read-only registry for a config file, rebuilt only when the file changes"""
+        path = Path(config_path).resolve()
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        return _load_registry(str(path), mtime_ns)
+    
+    def _freeze(self):
+        self.capabilities = MappingProxyType(
+            {category: MappingProxyType(caps) for category, caps in self.capabilities.items()}
+        )
+        self._flat = MappingProxyType(self._flat)
+    
     def load_from_yaml(self, path: Path):
-        """Load capabilities from YAML file"""
-        with open(path, 'r') as f:
-            self._raw_config = yaml.safe_load(f)
+        """Load capabilities from YAML file (via its JSON sidecar when up to date)"""
+        path = Path(path)
+        st = os.stat(path)
+        stamp = [st.st_mtime_ns, st.st_size]
+        sidecar = path.with_suffix(".cache.json")
+        
+        self._raw_config = self._read_sidecar(sidecar, stamp)
+        if self._raw_config is None:
+            # Bytes go straight to libyaml, which detects the encoding itself
+            with open(path, 'rb') as f:
+                self._raw_config = _load_capabilities_section(f)
+            self._write_sidecar(sidecar, stamp)
         
         caps = self._raw_config.get("capabilities", {})
         for category, items in caps.items():
@@ -53,16 +169,47 @@ class CapabilityRegistry:
                 self.capabilities[category] = {}
             
             for name, config in items.items():
-                self.capabilities[category][name] = Capability(
+                cap = Capability(
                     name=name,
                     category=category,
                     enabled=config.get("enabled", False),
                     config=config
                 )
+                self.capabilities[category][name] = cap
+                self._flat[(category, name)] = cap
+        
+        self._enabled_keys = tuple(key for key, cap in self._flat.items() if cap.enabled)
+        self._prompt_cache = None
+        self._allowed_imports_trie = _build_import_trie(self.get_allowed_imports())
+        self._blocked_imports_trie = _build_import_trie(self.get_blocked_imports())
+    
+    @staticmethod
+    def _read_sidecar(sidecar: Path, stamp: List[int]) -> Optional[Dict]:
+        """Parsed config cached for this exact YAML mtime/size, or None"""
+        try:
+            with open(sidecar, 'rb') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get("source_stamp") != stamp:
+            return None
+        return cached.get("config")
+    
+    def _write_sidecar(self, sidecar: Path, stamp: List[int]):
+        # Only cache configs JSON represents faithfully (no dates, non-string keys, ...)
+        try:
+            text = json.dumps({"source_stamp": stamp, "config": self._raw_config})
+            if json.loads(text)["config"] != self._raw_config:
+                return
+            tmp = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.tmp")
+            tmp.write_text(text)
+            os.replace(tmp, sidecar)
+        except (OSError, TypeError, ValueError):
+            pass  # read-only config dir: just parse the YAML next time
     
     def get_capability(self, category: str, name: str) -> Optional[Capability]:
         """Get a specific capability"""
-        return self.capabilities.get(category, {}).get(name)
+        return self._flat.get((category, name))
     
     def is_enabled(self, category: str, name: str) -> bool:
         """Check if capability is enabled"""
@@ -78,12 +225,11 @@ class CapabilityRegistry:
     
     def list_enabled(self) -> List[str]:
         """List all enabled capabilities"""
-        enabled = []
-        for category, caps in self.capabilities.items():
-            for name, cap in caps.items():
-                if cap.enabled:
-                    enabled.append(f"{category}.{name}")
-        return enabled
+        return [f"{category}.{name}" for category, name in self._enabled_keys]
+    
+    def snapshot(self) -> Mapping[str, Mapping[str, Capability]]:
+        """Return the in-memory capability table (read-only for registries from get())"""
+        return self.capabilities
     
     def list_all(self) -> Dict[str, List[str]]:
         """List all capabilities by category"""
@@ -97,8 +243,13 @@ class CapabilityRegistry:
         Check if an action is permitted
         Returns (allowed, reason)
         """
-        cap = self.get_capability(category, name)
-        
+        return self.evaluate_permission(self.get_capability(category, name), category, name, **kwargs)
+    
+    def evaluate_permission(self, cap: Optional[Capability], category: str, name: str, **kwargs) -> tuple[bool, str]:
+        """
+        Check an action against an already resolved capability
+        Returns (allowed, reason)
+        """
         if not cap:
             return False, f"Unknown capability: {category}.{name}"
         
@@ -106,32 +257,20 @@ class CapabilityRegistry:
             reason = cap.config.get("reason", "Capability is disabled")
             return False, reason
         
-        if "max_file_size" in cap.config and "file_size" in kwargs:
-            max_size = self._parse_size(cap.config["max_file_size"])
-            if kwargs["file_size"] > max_size:
+        if cap.max_file_size_bytes is not None and "file_size" in kwargs:
+            if kwargs["file_size"] > cap.max_file_size_bytes:
                 return False, f"File size exceeds limit of {cap.config['max_file_size']}"
         
-        if "allowed_extensions" in cap.config and "extension" in kwargs:
-            if kwargs["extension"] not in cap.config["allowed_extensions"]:
+        if cap.allowed_extensions is not None and "extension" in kwargs:
+            if kwargs["extension"] not in cap.allowed_extensions:
                 return False, f"Extension {kwargs['extension']} not allowed"
         
-        if "timeout_seconds" in cap.config and "duration" in kwargs:
-            if kwargs["duration"] > cap.config["timeout_seconds"]:
+        if cap.timeout_seconds is not None and "duration" in kwargs:
+            if kwargs["duration"] > cap.timeout_seconds:
                 return False, f"Operation would exceed timeout of {cap.config['timeout_seconds']}s"
         
         return True, "Allowed"
     
-    def _parse_size(self, size_str: str) -> int:
-        """Parse size string like '10MB' to bytes"""
-        size_str = size_str.upper()
-        if size_str.endswith("GB"):
-            return int(size_str[:-2]) * 1024 * 1024 * 1024
-        elif size_str.endswith("MB"):
-            return int(size_str[:-2]) * 1024 * 1024
-        elif size_str.endswith("KB"):
-            return int(size_str[:-2]) * 1024
-        return int(size_str)
-    
     def get_allowed_imports(self) -> List[str]:
         """Get list of allowed Python imports"""
         return self.get_config("code_execution", "python", "allowed_imports", [])
@@ -140,12 +279,25 @@ class CapabilityRegistry:
         """Get list of blocked Python imports"""
         return self.get_config("code_execution", "python", "blocked_imports", [])
     
+    def is_import_blocked(self, module: str) -> bool:
+        """Whether a module (e.g. 'os.path') or a parent package is blocked"""
+        return _trie_covers(self._blocked_imports_trie, module)
+    
+    def is_import_allowed(self, module: str) -> bool:
+        """Whether a module is covered by the allowlist and not blocked"""
+        return not self.is_import_blocked(module) and _trie_covers(self._allowed_imports_trie, module)
+    
     def get_allowed_extensions(self, operation: str) -> List[str]:
         """Get allowed file extensions for operation"""
         return self.get_config("file_operations", operation, "allowed_extensions", [])
     
     def to_prompt_context(self) -> str:
-        """Generate capability context for system prompt"""
+        """Capability context for system prompt, built once per loaded config"""
+        if self._prompt_cache is None:
+            self._prompt_cache = self._build_prompt_context()
+        return self._prompt_cache
+    
+    def _build_prompt_context(self) -> str:
         lines = ["=== AVAILABLE CAPABILITIES ==="]
         
         for category, caps in self.capabilities.items():
@@ -165,3 +317,10 @@ class CapabilityRegistry:
                     lines.append(f"  - {cap.name}{info}")
         
         return "\n".join(lines)
+
+
+@functools.lru_cache(maxsize=32)
+def _load_registry(path_str: str, mtime_ns: Optional[int]) -> CapabilityRegistry:
+    registry = CapabilityRegistry(Path(path_str))
+    registry._freeze()
+    return registry
@@ -3,19 +3,64 @@ Session Manager
 Handles chat session lifecycle, state management, and RAG collection initialization
 """
 import uuid
+import threading
+from collections import Counter, OrderedDict
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
+from sqlalchemy import case, or_, select, update
 from sqlalchemy.orm import Session as DBSession
 
 from database.models import Session, Message, RAGCollection, SessionStatus, MessageRole, CollectionType
-from database.connection import get_db_session
+from database.connection import get_db_session, get_db_readonly
+
+# Enum values resolved once instead of a .value lookup per call
+_STATUS_ACTIVE = SessionStatus.ACTIVE.value
+_STATUS_ARCHIVED = SessionStatus.ARCHIVED.value
+_STATUS_DELETED = SessionStatus.DELETED.value
+_COLLECTION_SESSION = CollectionType.SESSION.value
+
+# Most recently used sessions tracked in memory; the DB is the source of truth,
+# so evicting one only forgets its in-process bookkeeping
+ACTIVE_SESSIONS_MAX = 1024
+
+# Message columns read with Core selects and turned straight into Message.to_dict() shaped dicts
+_MESSAGE_COLUMNS = (
+    Message.id, Message.session_id, Message.role, Message.content, Message.created_at,
+    Message.extra_data, Message.parent_id, Message.vector_id, Message.tokens_used
+)
+
+
+def _message_dict(row) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "session_id": row.session_id,
+        "role": row.role,
+        "content": row.content,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "metadata": row.extra_data,
+        "parent_id": row.parent_id,
+        "vector_id": row.vector_id,
+        "tokens_used": row.tokens_used
+    }
 
 
 class SessionManager:
     """Manages chat sessions and their lifecycle"""
     
     def __init__(self):
-        self.active_sessions: Dict[str, Dict[str, Any]] = {}
+        self.active_sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._active_lock = threading.Lock()
+    
+    def _track(self, session_id: str, info: Dict[str, Any]):
+        with self._active_lock:
+            self.active_sessions[session_id] = info
+            self.active_sessions.move_to_end(session_id)
+            while len(self.active_sessions) > ACTIVE_SESSIONS_MAX:
+                self.active_sessions.popitem(last=False)
+    
+    def _untrack(self, session_id: str):
+        with self._active_lock:
+            self.active_sessions.pop(session_id, None)
     
     def create_session(self, title: Optional[str] = None, user_id: Optional[str] = None) -> Dict[str, Any]:
         """Create a new chat session with fresh RAG collection"""
@@ -26,30 +71,30 @@ class SessionManager:
             session = Session(
                 id=session_id,
                 title=title or "New Chat",
-                status=SessionStatus.ACTIVE.value,
+                status=_STATUS_ACTIVE,
                 rag_collection_id=rag_collection_id,
                 user_id=user_id,
                 extra_data={"created_via": "session_manager"}
             )
-            db.add(session)
             
             rag_collection = RAGCollection(
                 id=rag_collection_id,
                 session_id=session_id,
-                type=CollectionType.SESSION.value,
+                type=_COLLECTION_SESSION,
                 name=f"Session {session_id[:8]}",
                 extra_data={"isolated": True}
             )
-            db.add(rag_collection)
+            # Plain INSERTs (session row first, for the FK) without identity-map bookkeeping
+            db.bulk_save_objects([session, rag_collection])
             
             result = session.to_dict()
         
-        self.active_sessions[session_id] = {
+        self._track(session_id, {
             "id": session_id,
             "rag_collection_id": rag_collection_id,
             "created_at": datetime.utcnow(),
             "message_count": 0
-        }
+        })
         
         return result
     
@@ -69,7 +114,7 @@ class SessionManager:
             if status:
                 query = query.filter(Session.status == status)
             
-            query = query.filter(Session.status != SessionStatus.DELETED.value)
+            query = query.filter(Session.status != _STATUS_DELETED)
             query = query.order_by(Session.updated_at.desc())
             query = query.offset(offset).limit(limit)
             
@@ -97,9 +142,8 @@ class SessionManager:
     
     def archive_session(self, session_id: str) -> bool:
         """Archive a session"""
-        result = self.update_session(session_id, status=SessionStatus.ARCHIVED.value)
-        if session_id in self.active_sessions:
-            del self.active_sessions[session_id]
+        result = self.update_session(session_id, status=_STATUS_ARCHIVED)
+        self._untrack(session_id)
         return result is not None
     
     def delete_session(self, session_id: str, hard_delete: bool = False) -> bool:
@@ -112,11 +156,11 @@ class SessionManager:
                     db.delete(session)
                     success = True
         else:
-            result = self.update_session(session_id, status=SessionStatus.DELETED.value)
+            result = self.update_session(session_id, status=_STATUS_DELETED)
             success = result is not None
         
-        if success and session_id in self.active_sessions:
-            del self.active_sessions[session_id]
+        if success:
+            self._untrack(session_id)
         return success
     
     def add_message(self, session_id: str, role: str, content: str, metadata: Optional[Dict] = None) -> Dict[str, Any]:
@@ -133,32 +177,57 @@ class SessionManager:
             )
             db.add(message)
             
-            session = db.query(Session).filter(Session.id == session_id).first()
-            if session:
-                session.updated_at = datetime.utcnow()
-                if not session.title or session.title == "New Chat":
-                    session.title = content[:50] + "..." if len(content) > 50 else content
+            # One UPDATE instead of loading the session: bump updated_at and title a new chat
+            new_title = content[:50] + "..." if len(content) > 50 else content
+            db.execute(
+                update(Session)
+                .where(Session.id == session_id)
+                .values(
+                    updated_at=datetime.utcnow(),
+                    title=case(
+                        (or_(Session.title.is_(None), Session.title.in_(("", "New Chat"))), new_title),
+                        else_=Session.title
+                    )
+                )
+                .execution_options(synchronize_session=False)
+            )
             
             result = message.to_dict()
         
-        if session_id in self.active_sessions:
-            self.active_sessions[session_id]["message_count"] += 1
+        with self._active_lock:
+            if session_id in self.active_sessions:
+                self.active_sessions[session_id]["message_count"] += 1
+                self.active_sessions.move_to_end(session_id)
         
         return result
     
     def get_messages(self, session_id: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
         """Get messages for a session"""
-        with get_db_session() as db:
-            messages = db.query(Message)\
-                .filter(Message.session_id == session_id)\
-                .order_by(Message.created_at.asc())\
-                .offset(offset).limit(limit)\
-                .all()
-            return [m.to_dict() for m in messages]
+        return list(self.iter_messages(session_id, limit=limit, offset=offset))
+    
+    def iter_messages(self, session_id: str, limit: int = 100, offset: int = 0) -> Iterator[Dict[str, Any]]:
+        """Yield messages for a session one at a time, fetching rows in batches"""
+        query = select(*_MESSAGE_COLUMNS)\
+            .where(Message.session_id == session_id)\
+            .order_by(Message.created_at.asc())\
+            .offset(offset).limit(limit)
+        with get_db_readonly() as conn:
+            for row in conn.execution_options(yield_per=100).execute(query):
+                yield _message_dict(row)
+    
+    def get_recent_messages(self, session_id: str, n: int = 10) -> List[Dict[str, Any]]:
+        """Get the last n messages of a session, oldest first"""
+        query = select(*_MESSAGE_COLUMNS)\
+            .where(Message.session_id == session_id)\
+            .order_by(Message.created_at.desc())\
+            .limit(n)
+        with get_db_readonly() as conn:
+            rows = conn.execute(query).all()
+        return [_message_dict(row) for row in reversed(rows)]
     
     def get_session_context(self, session_id: str, max_messages: int = 10) -> List[Dict[str, str]]:
         """Get recent messages formatted for LLM context"""
-        messages = self.get_messages(session_id, limit=max_messages)
+        messages = self.get_recent_messages(session_id, max_messages)
         return [{"role": m["role"], "content": m["content"]} for m in messages]
     
     def resume_session(self, session_id: str) -> Optional[Dict[str, Any]]:
@@ -167,30 +236,31 @@ class SessionManager:
         if not session:
             return None
         
-        self.update_session(session_id, status=SessionStatus.ACTIVE.value)
+        self.update_session(session_id, status=_STATUS_ACTIVE)
         
-        self.active_sessions[session_id] = {
+        self._track(session_id, {
             "id": session_id,
             "rag_collection_id": session.get("rag_collection_id"),
             "resumed_at": datetime.utcnow(),
-            "message_count": len(self.get_messages(session_id))
-        }
+            "message_count": session.get("message_count", 0)
+        })
         
         return self.get_session(session_id)
     
     def generate_summary(self, session_id: str) -> Optional[str]:
         """Generate AI summary of session (placeholder)"""
-        messages = self.get_messages(session_id)
-        if not messages:
-            return None
-        
-        topics = set()
-        for m in messages:
+        # One streamed pass; the opening words of the most frequently asked questions win
+        topics = Counter()
+        has_messages = False
+        for m in self.iter_messages(session_id):
+            has_messages = True
             if m["role"] == "user":
-                words = m["content"].split()[:5]
-                topics.add(" ".join(words))
+                words = m["content"].split(maxsplit=5)[:5]
+                topics[" ".join(words)] += 1
+        if not has_messages:
+            return None
         
-        summary = f"Discussion about: {', '.join(list(topics)[:3])}"
+        summary = f"Discussion about: {', '.join(topic for topic, _ in topics.most_common(3))}"
         self.update_session(session_id, summary=summary)
         return summary
 
@@ -5,7 +5,7 @@ from .models import (
 )
 from .connection import (
     get_engine, get_session_factory, init_database, drop_database,
-    get_db_session, get_db, DatabaseManager, db_manager
+    get_db_session, get_db_readonly, get_db, DatabaseManager, db_manager
 )
 
 __all__ = [
@@ -13,5 +13,5 @@ __all__ = [
     'SessionStatus', 'MessageRole', 'ActionStatus', 'AppStatus', 'AppCreator',
     'CollectionType', 'DocumentStatus',
     'get_engine', 'get_session_factory', 'init_database', 'drop_database',
-    'get_db_session', 'get_db', 'DatabaseManager', 'db_manager'
+    'get_db_session', 'get_db_readonly', 'get_db', 'DatabaseManager', 'db_manager'
 ]
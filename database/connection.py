@@ -6,7 +6,6 @@ import os
 from contextlib import contextmanager
 from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
 
 from .models import Base
 
@@ -22,10 +21,14 @@ def get_engine():
     global engine
     if engine is None:
         os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
+        # A pool of connections instead of one shared StaticPool connection: under WAL,
+        # readers on other connections proceed while a writer holds the lock.
+        # check_same_thread stays off since pooled connections move between threads
         engine = create_engine(
             DATABASE_URL,
-            connect_args={"check_same_thread": False},
-            poolclass=StaticPool,
+            connect_args={"check_same_thread": False, "timeout": 30},
+            pool_size=5,
+            max_overflow=10,
             echo=False
         )
         @event.listens_for(engine, "connect")
@@ -33,6 +36,14 @@ def get_engine():
             cursor = dbapi_connection.cursor()
             cursor.execute("PRAGMA foreign_keys=ON")
             cursor.execute("PRAGMA journal_mode=WAL")
+            # Wait for a competing writer instead of failing with "database is locked";
+            # NORMAL is durable under WAL except for the last commits on power loss
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            # 20MB page cache, in-memory temp tables/sorts, reads served from a 256MB mapping
+            cursor.execute("PRAGMA cache_size=-20000")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA mmap_size=268435456")
             cursor.close()
     return engine
 
@@ -49,6 +60,10 @@ def init_database():
     """Initialize database tables"""
     engine = get_engine()
     Base.metadata.create_all(bind=engine)
+    # create_all skips existing tables together with their indexes; add new indexes to older DBs
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
     return engine
 
 
@@ -73,6 +88,13 @@ def get_db_session():
         session.close()
 
 
+@contextmanager
+def get_db_readonly():
+    """Core connection for pure reads: no ORM session, identity map or COMMIT"""
+    with get_engine().connect() as conn:
+        yield conn
+
+
 def get_db():
     """FastAPI dependency for database sessions with auto-commit"""
     SessionFactory = get_session_factory()
@@ -6,8 +6,8 @@ import uuid
 from datetime import datetime
 from enum import Enum
 from typing import Optional, List, Dict, Any
-from sqlalchemy import create_engine, Column, String, Text, Integer, Float, Boolean, DateTime, ForeignKey, JSON, Enum as SQLEnum
-from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+from sqlalchemy import create_engine, Column, String, Text, Integer, Float, Boolean, DateTime, ForeignKey, Index, JSON, Enum as SQLEnum, func, select
+from sqlalchemy.orm import column_property, declarative_base, relationship, sessionmaker
 from sqlalchemy.dialects.sqlite import JSON as SQLiteJSON
 
 Base = declarative_base()
@@ -65,6 +65,8 @@ def generate_uuid():
 class Session(Base):
     """Chat session with RAG collection"""
     __tablename__ = "sessions"
+    # list_sessions: filter on status, newest first
+    __table_args__ = (Index('ix_sessions_status_updated', 'status', 'updated_at'),)
     
     id = Column(String(36), primary_key=True, default=generate_uuid)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -95,13 +97,15 @@ class Session(Base):
             "is_public": self.is_public,
             "tags": self.tags,
             "summary": self.summary,
-            "message_count": len(self.messages) if self.messages else 0
+            "message_count": self.message_count or 0
         }
 
 
 class Message(Base):
     """Chat message with metadata"""
     __tablename__ = "messages"
+    # A session's history is a range scan already in created_at order (also serves the FK)
+    __table_args__ = (Index('ix_messages_session_created', 'session_id', 'created_at'),)
     
     id = Column(String(36), primary_key=True, default=generate_uuid)
     session_id = Column(String(36), ForeignKey("sessions.id"), nullable=False)
@@ -130,6 +134,16 @@ class Message(Base):
         }
 
 
+# Counted in the same SELECT that loads the session, so listing sessions never
+# lazy-loads their messages (no N+1, no schema change for existing databases)
+Session.message_count = column_property(
+    select(func.count(Message.id))
+    .where(Message.session_id == Session.id)
+    .correlate_except(Message)
+    .scalar_subquery()
+)
+
+
 class AgentAction(Base):
     """Agent execution log"""
     __tablename__ = "agent_actions"
@@ -4,15 +4,22 @@ Export chat history to PDF, Markdown, or Word formats
 import os
 import html
 from datetime import datetime
+from functools import lru_cache
 from typing import List, Dict
 from pathlib import Path
 
 
+@lru_cache(maxsize=4096)
+def _esc(value: str) -> str:
+    """html.escape for short metadata strings (sources, paths, pages) that repeat across answers"""
+    return html.escape(value)
+
+
 def generate_markdown(chat_history: List[Dict]) -> str:
     """Generate Markdown report from chat history"""
-    md = f"# Chat Report\n\n"
-    md += f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-    md += "---\n\n"
+    parts = ["# Chat Report\n\n"]
+    parts.append(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+    parts.append("---\n\n")
     
     image_paths = []
     
@@ -22,26 +29,26 @@ def generate_markdown(chat_history: List[Dict]) -> str:
         metadata = entry.get('metadata', {})
         
         if role == 'user':
-            md += f"## Question {i}\n\n"
-            md += f"{content}\n\n"
+            parts.append(f"## Question {i}\n\n")
+            parts.append(f"{content}\n\n")
         elif role == 'assistant':
-            md += f"## Answer {i}\n\n"
-            md += f"{content}\n\n"
+            parts.append(f"## Answer {i}\n\n")
+            parts.append(f"{content}\n\n")
             
             # Add metadata
             if metadata:
-                md += "**Metadata:**\n"
+                parts.append("**Metadata:**\n")
                 if 'confidence' in metadata:
                     try:
                         conf_val = float(metadata['confidence'])
-                        md += f"- Confidence: {conf_val:.0%}\n"
+                        parts.append(f"- Confidence: {conf_val:.0%}\n")
                     except (ValueError, TypeError):
-                        md += f"- Confidence: {metadata['confidence']}\n"
+                        parts.append(f"- Confidence: {metadata['confidence']}\n")
                 if 'verified' in metadata:
-                    md += f"- Verified: {'✓' if metadata['verified'] else '✗'}\n"
+                    parts.append(f"- Verified: {'✓' if metadata['verified'] else '✗'}\n")
                 if 'sources' in metadata:
-                    md += f"- Sources: {metadata['sources']}\n"
-                md += "\n"
+                    parts.append(f"- Sources: {metadata['sources']}\n")
+                parts.append("\n")
             
             # Collect image paths
             if metadata.get('image_paths'):
@@ -50,22 +57,22 @@ def generate_markdown(chat_history: List[Dict]) -> str:
                     if img_path and img_path not in image_paths:
                         image_paths.append(img_path)
         
-        md += "---\n\n"
+        parts.append("---\n\n")
     
     # Add images section at the end
     if image_paths:
-        md += "# Related Figures\n\n"
+        parts.append("# Related Figures\n\n")
         for i, img_path in enumerate(image_paths, 1):
-            md += f"## Figure {i}\n\n"
-            md += f"![Figure {i}]({img_path})\n\n"
-            md += f"*Source: {img_path}*\n\n"
+            parts.append(f"## Figure {i}\n\n")
+            parts.append(f"![Figure {i}]({img_path})\n\n")
+            parts.append(f"*Source: {img_path}*\n\n")
     
-    return md
+    return "".join(parts)
 
 
 def generate_html(chat_history: List[Dict]) -> str:
     """Generate HTML report from chat history"""
-    html_out = f"""<!DOCTYPE html>
+    parts = [f"""<!DOCTYPE html>
 <html>
 <head>
     <meta charset="UTF-8">
@@ -123,7 +130,7 @@ def generate_html(chat_history: List[Dict]) -> str:
         <h1>Chat Report</h1>
         <p><strong>Generated:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
     </div>
-"""
+"""]
     
     image_paths = []
     
@@ -136,34 +143,34 @@ def generate_html(chat_history: List[Dict]) -> str:
         metadata = entry.get('metadata', {})
         
         if role == 'user':
-            html_out += f"""
+            parts.append(f"""
     <div class="entry user">
         <h2>Question {i}</h2>
         <p>{content}</p>
     </div>
-"""
+""")
         elif role == 'assistant':
-            html_out += f"""
+            parts.append(f"""
     <div class="entry assistant">
         <h2>Answer {i}</h2>
         <p>{content}</p>
-"""
+""")
             if metadata:
-                html_out += '        <div class="metadata">\n'
+                parts.append('        <div class="metadata">\n')
                 if 'confidence' in metadata:
                     try:
                         conf_val = float(metadata['confidence'])
-                        html_out += f'            <p><strong>Confidence:</strong> {conf_val:.0%}</p>\n'
+                        parts.append(f'            <p><strong>Confidence:</strong> {conf_val:.0%}</p>\n')
                     except (ValueError, TypeError):
-                        html_out += f'            <p><strong>Confidence:</strong> {html.escape(str(metadata["confidence"]))}</p>\n'
+                        parts.append(f'            <p><strong>Confidence:</strong> {_esc(str(metadata["confidence"]))}</p>\n')
                 if 'verified' in metadata:
                     verified = '✓' if metadata['verified'] else '✗'
-                    html_out += f'            <p><strong>Verified:</strong> {verified}</p>\n'
+                    parts.append(f'            <p><strong>Verified:</strong> {verified}</p>\n')
                 if 'sources' in metadata:
-                    html_out += f'            <p><strong>Sources:</strong> {html.escape(str(metadata["sources"]))}</p>\n'
-                html_out += '        </div>\n'
+                    parts.append(f'            <p><strong>Sources:</strong> {_esc(str(metadata["sources"]))}</p>\n')
+                parts.append('        </div>\n')
             
-            html_out += '    </div>\n'
+            parts.append('    </div>\n')
             
             # Collect image paths
             if metadata.get('image_paths'):
@@ -174,30 +181,30 @@ def generate_html(chat_history: List[Dict]) -> str:
     
     # Add images section
     if image_paths:
-        html_out += """
+        parts.append("""
     <div class="images">
         <h1>Related Figures</h1>
-"""
+""")
         for i, (img_path, source, page) in enumerate(image_paths, 1):
-            safe_img_path = html.escape(str(img_path))
-            safe_source = html.escape(str(source))
-            safe_page = html.escape(str(page))
-            html_out += f"""
+            safe_img_path = _esc(str(img_path))
+            safe_source = _esc(str(source))
+            safe_page = _esc(str(page))
+            parts.append(f"""
         <div class="image-item">
             <h2>Figure {i}</h2>
             <img src="{safe_img_path}" alt="Figure {i}">
             <p><em>Source: {safe_source} (Page {safe_page})</em></p>
         </div>
-"""
-        html_out += """
+""")
+        parts.append("""
     </div>
-"""
+""")
     
-    html_out += """
+    parts.append("""
 </body>
 </html>
-"""
-    return html_out
+""")
+    return "".join(parts)
 
 
 def save_markdown(chat_history: List[Dict], output_path: str) -> str:
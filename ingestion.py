@@ -3,11 +3,57 @@ from PIL import Image
 import io
 import os
 import re
-from typing import List, Dict, Any, Tuple, Optional
-from vector_store import VectorStore
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple, Optional
 import hashlib
 from tqdm import tqdm
 
+if TYPE_CHECKING:
+    # Annotation only: page-shard and ingest workers never load the embedding stack
+    from vector_store import VectorStore
+
+# Extension -> DocumentProcessor method that ingests it
+PROCESSORS_BY_EXT = {
+    '.pdf': 'process_pdf',
+    '.docx': 'process_word',
+    '.doc': 'process_word',
+    '.md': 'process_markdown',
+    '.txt': 'process_text',
+    '.rtf': 'process_rtf',
+}
+
+# PDFs with at least PDF_PARALLEL_MIN_PAGES pages are parsed in page shards
+# across PDF_PAGE_WORKERS processes (1 disables it). Sharding only happens in a
+# top-level process: inside a pool worker (the API's INGEST_POOL) the pool already
+# uses the cores, so pages are parsed sequentially there
+PDF_PAGE_WORKERS = int(os.getenv("PDF_PAGE_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+PDF_PARALLEL_MIN_PAGES = 8
+
+_page_pool: Optional[ProcessPoolExecutor] = None
+_page_pool_lock = threading.Lock()
+
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    """Shared page-shard pool, created on first use"""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(max_workers=PDF_PAGE_WORKERS)
+        return _page_pool
+
+
+def _reset_page_pool():
+    """Drop a broken page-shard pool so the next PDF starts a fresh one"""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is not None:
+            _page_pool.shutdown(wait=False)
+            _page_pool = None
+
+
 class DocumentProcessor:
     """
     Enhanced Document Processor with Multimodal Image Retrieval
@@ -16,7 +62,7 @@ class DocumentProcessor:
     - Provides proper metadata for source attribution
     """
     
-    def __init__(self, vector_store: VectorStore, chunk_size: int = 800, chunk_overlap: int = 160):
+    def __init__(self, vector_store: "VectorStore", chunk_size: int = 800, chunk_overlap: int = 160):
         self.vector_store = vector_store
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
@@ -88,10 +134,11 @@ class DocumentProcessor:
                 return text[start:end].strip()
         return None
     
-    def _extract_images_pymupdf(self, doc: fitz.Document, file_hash: str, filename_base: str) -> Dict[int, List[Dict]]:
+    def _extract_images_pymupdf(self, doc: fitz.Document, file_hash: str, filename_base: str,
+                                pages: Optional[range] = None) -> Dict[int, List[Dict]]:
         """
         Extract images from PDF using PyMuPDF with better quality
-        Returns: Dict mapping page_num -> list of image info dicts
+        Returns: Dict mapping page_num -> list of image info dicts (all pages unless given)
         """
         page_images = {}
         
@@ -99,7 +146,7 @@ class DocumentProcessor:
         doc_images_dir = os.path.join(self.images_dir, filename_base)
         os.makedirs(doc_images_dir, exist_ok=True)
         
-        for page_num in range(len(doc)):
+        for page_num in (range(len(doc)) if pages is None else pages):
             page = doc[page_num]
             image_list = page.get_images(full=True)
             page_images[page_num] = []
@@ -203,25 +250,21 @@ class DocumentProcessor:
         filename = os.path.basename(pdf_path)
         filename_base = self._sanitize_filename(filename)
         
-        with open(pdf_path, 'rb') as f:
-            file_hash = hashlib.sha256(f.read()).hexdigest()[:8]
-        
-        # Use PyMuPDF for processing
-        doc = fitz.open(pdf_path)
+        file_hash = self._generate_file_hash(pdf_path)
         
-        # Extract all images first
+        # Extract images and page text first, in parallel shards for long PDFs
         print("Extracting images...")
-        page_images = self._extract_images_pymupdf(doc, file_hash, filename_base)
+        page_texts, page_images = self._parse_pdf_pages(pdf_path, file_hash, filename_base)
+        num_pages = len(page_texts)
         total_images = sum(len(imgs) for imgs in page_images.values())
-        print(f"Extracted {total_images} images from {len(doc)} pages")
+        print(f"Extracted {total_images} images from {num_pages} pages")
         
         all_texts = []
         all_metadatas = []
         all_ids = []
         
-        for page_num in tqdm(range(len(doc)), desc="Processing pages"):
-            page = doc[page_num]
-            text = page.get_text()
+        for page_num in tqdm(range(num_pages), desc="Processing pages"):
+            text = page_texts[page_num]
             
             if text.strip():
                 chunks = self._chunk_text(text)
@@ -267,9 +310,6 @@ class DocumentProcessor:
                     all_metadatas.append(metadata)
                     all_ids.append(chunk_id)
         
-        num_pages = len(doc)
-        doc.close()
-        
         # FIX 2: Create separate vector chunks for images
         # This ensures images are retrievable via caption search
         # Use multiple search keys to improve discoverability
@@ -336,6 +376,30 @@ This is an image/figure that can be displayed with markdown."""
             "status": "success"
         }
 
+    def _parse_pdf_pages(self, pdf_path: str, file_hash: str, filename_base: str
+                         ) -> Tuple[Dict[int, str], Dict[int, List[Dict]]]:
+        """Return (page_num -> text, page_num -> images), sharding pages across processes"""
+        with fitz.open(pdf_path) as doc:
+            num_pages = len(doc)
+        workers = min(PDF_PAGE_WORKERS, num_pages)
+        if (workers > 1 and num_pages >= PDF_PARALLEL_MIN_PAGES
+                and multiprocessing.parent_process() is None):
+            step = -(-num_pages // workers)
+            shards = [range(start, min(start + step, num_pages)) for start in range(0, num_pages, step)]
+            try:
+                page_texts, page_images = {}, {}
+                for texts, images in _get_page_pool().map(
+                        _parse_pdf_shard, [pdf_path] * len(shards), [file_hash] * len(shards),
+                        [filename_base] * len(shards), shards, [self.images_dir] * len(shards)):
+                    page_texts.update(texts)
+                    page_images.update(images)
+                return page_texts, page_images
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    _reset_page_pool()
+                print(f"Parallel page parsing failed ({e}), falling back to sequential")
+        return _parse_pdf_shard(pdf_path, file_hash, filename_base, range(num_pages), self.images_dir)
+
     def process_word(self, docx_path: str) -> Dict[str, Any]:
         """Process Word document (.docx/.doc) and add to vector store"""
         try:
@@ -492,10 +556,23 @@ This is an image/figure that can be displayed with markdown."""
 
         return {"num_chunks": len(all_texts), "filename": filename, "status": "success"}
 
+    def process_file(self, file_path: str) -> Dict[str, Any]:
+        """Dispatch to the processor matching the file's extension"""
+        ext = os.path.splitext(file_path)[1].lower()
+        method = PROCESSORS_BY_EXT.get(ext)
+        if method is None:
+            raise ValueError(f"Unsupported extension: {ext}")
+        return getattr(self, method)(file_path)
+
     def _generate_file_hash(self, file_path: str) -> str:
-        """Generate hash for any file"""
+        """Generate hash for any file without loading it whole into memory"""
         with open(file_path, 'rb') as f:
-            return hashlib.sha256(f.read()).hexdigest()[:8]
+            if hasattr(hashlib, 'file_digest'):  # Python 3.11+: C-level read loop
+                return hashlib.file_digest(f, 'sha256').hexdigest()[:8]
+            hasher = hashlib.sha256()
+            for block in iter(lambda: f.read(1 << 20), b''):
+                hasher.update(block)
+        return hasher.hexdigest()[:8]
     
     def process_directory(self, directory_path: str):
         # SECURITY: Validate the directory exists and resolve to absolute path
@@ -503,31 +580,53 @@ This is an image/figure that can be displayed with markdown."""
         if not os.path.isdir(abs_dir):
             raise ValueError(f"Directory not found: {directory_path}")
         
-        supported_extensions = ['.pdf', '.docx', '.doc', '.md', '.txt', '.rtf']
         files = [f for f in os.listdir(abs_dir)
-                 if any(f.lower().endswith(ext) for ext in supported_extensions)]
+                 if os.path.splitext(f)[1].lower() in PROCESSORS_BY_EXT]
 
         results = []
         for file in files:
             # SECURITY: Use only the basename to prevent traversal via crafted filenames
             file_path = os.path.join(abs_dir, os.path.basename(file))
-            ext = os.path.splitext(file)[1].lower()
             try:
-                if ext == '.pdf':
-                    result = self.process_pdf(file_path)
-                elif ext in ['.docx', '.doc']:
-                    result = self.process_word(file_path)
-                elif ext == '.md':
-                    result = self.process_markdown(file_path)
-                elif ext == '.txt':
-                    result = self.process_text(file_path)
-                elif ext == '.rtf':
-                    result = self.process_rtf(file_path)
-                else:
-                    raise ValueError(f"Unsupported extension: {ext}")
-                results.append(result)
+                results.append(self.process_file(file_path))
             except Exception as e:
                 print(f"Error processing {file}: {e}")
                 results.append({"file": file, "status": "error", "error": str(e)})
 
         return results
+
+
+def _parse_pdf_shard(pdf_path: str, file_hash: str, filename_base: str, pages: range,
+                     images_dir: str) -> Tuple[Dict[int, str], Dict[int, List[Dict]]]:
+    """Extract text and images for a contiguous page range (top-level so it pickles)"""
+    processor = DocumentProcessor(None)
+    processor.images_dir = images_dir
+    with fitz.open(pdf_path) as doc:
+        page_images = processor._extract_images_pymupdf(doc, file_hash, filename_base, pages)
+        page_texts = {page_num: doc[page_num].get_text() for page_num in pages}
+    return page_texts, page_images
+
+
+class _ChunkCollector:
+    """Stands in for a VectorStore: keeps chunks instead of embedding them"""
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.ids: List[str] = []
+
+    def add_documents(self, texts: List[str], metadatas: List[Dict[str, Any]], ids: List[str]):
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas)
+        self.ids.extend(ids)
+
+
+def extract_chunks(file_path: str, chunk_size: int = 800, chunk_overlap: int = 160
+                   ) -> Tuple[Dict[str, Any], List[str], List[Dict[str, Any]], List[str]]:
+    """
+    Parse and chunk a file without embedding it, so it can run in a worker process.
+    Returns (result, texts, metadatas, ids); the caller adds the chunks to its own store.
+    """
+    collector = _ChunkCollector()
+    result = DocumentProcessor(collector, chunk_size, chunk_overlap).process_file(file_path)
+    return result, collector.texts, collector.metadatas, collector.ids
@@ -4,6 +4,7 @@ import json
 import time
 import base64
 import re
+import threading
 from pathlib import Path
 
 # DeepSeek-R1-Distill-Qwen uses ChatML format stop tokens (NOT Llama-3 tokens)
@@ -11,6 +12,8 @@ _IM_END = "<" + "|im_end|" + ">"
 _ENDOFTEXT = "<" + "|endoftext|" + ">"
 DEEPSEEK_STOP_TOKENS = [_IM_END, _ENDOFTEXT]
 
+HEALTH_TTL = 2.0  # seconds a /health probe result is reused before the server is asked again
+
 
 def strip_think_tags(text: str) -> str:
     """Strip DeepSeek-R1 reasoning <think>...</think> blocks from output."""
@@ -25,6 +28,8 @@ class LLMClient:
         self.base_url = base_url
         self.multimodal_base_url = multimodal_base_url
         self.model = None
+        self._health = {}  # url -> (checked_at, ok)
+        self._health_lock = threading.Lock()
         self._try_load_direct_model()
     
     def _try_load_direct_model(self):
@@ -73,20 +78,25 @@ class LLMClient:
         """Check if LLM is available"""
         if self.model:
             return True
-        
-        try:
-            response = requests.get(f"{self.base_url}/health", timeout=5)
-            return response.status_code == 200
-        except (requests.RequestException, Exception):
-            return False
+        return self._probe_health(self.base_url)
     
     def multimodal_health_check(self):
         """Check if multimodal server is available"""
-        try:
-            response = requests.get(f"{self.multimodal_base_url}/health", timeout=5)
-            return response.status_code == 200
-        except (requests.RequestException, Exception):
-            return False
+        return self._probe_health(self.multimodal_base_url)
+    
+    def _probe_health(self, base_url: str) -> bool:
+        """GET {base_url}/health, reusing the result for HEALTH_TTL seconds"""
+        with self._health_lock:
+            checked_at, ok = self._health.get(base_url, (float("-inf"), False))
+            now = time.monotonic()
+            if now - checked_at > HEALTH_TTL:
+                try:
+                    response = requests.get(f"{base_url}/health", timeout=5)
+                    ok = response.status_code == 200
+                except (requests.RequestException, Exception):
+                    ok = False
+                self._health[base_url] = (now, ok)
+            return ok
     
     def generate(self, prompt: str, max_tokens: int = 400, temperature: float = 0.6, top_p: float = 0.9, stop: list = None, max_retries: int = 3):
         """Generate response from LLM with retry logic and validation"""
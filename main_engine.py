@@ -1,8 +1,9 @@
 from agents import QueryUnderstandingAgent, RetrievalAgent, ReasoningAgent, VerificationAgent
 from llm_client import LLMClient
 from vector_store import VectorStore
-from cache import get_cache
-from typing import Dict, Any, Optional, Callable
+from cache import get_cache, SEMANTIC_CACHE_ENABLED
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable
 import html
 import time
 import re
@@ -26,6 +27,10 @@ except ImportError:
     HYBRID_AVAILABLE = False
     print("Warning: HybridRetrievalAgent not available, using standard retrieval")
 
+# HybridRetrievalAgent's vector leg fetches 2 * top_k (default 10) hits per query
+BATCH_SEARCH_K = 20
+BATCH_MAX_WORKERS = 8
+
 class Orchestrator:
     def __init__(
         self,
@@ -233,7 +238,8 @@ class Orchestrator:
         self,
         user_query: str,
         progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
-        use_cache: bool = True
+        use_cache: bool = True,
+        prefetched_search: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         print("\n" + "=" * 70)
         print("ORCHESTRATOR: Starting query processing")
@@ -278,7 +284,15 @@ class Orchestrator:
             })
         
         # Try cache for specialized queries
-        cached_response = self.cache.get(user_query) if use_cache else None
+        cached_response = None
+        query_embedding = None
+        if use_cache:
+            # Exact match first, then a paraphrase of a previously answered query
+            cached_response = self.cache.get(user_query)
+            if cached_response is None and SEMANTIC_CACHE_ENABLED:
+                # Embedded once: on a miss, the vector search below reuses it
+                query_embedding = self.vector_store.embed([user_query])
+                cached_response = self.cache.semantic_lookup(user_query, query_embedding=query_embedding[0])
         if cached_response:
             print(f"💾 CACHE HIT: Returning cached response")
             emit({"type": "phase_start", "phase": "query_understanding", "message": "Cache hit: quick path"})
@@ -302,15 +316,21 @@ class Orchestrator:
             emit({"type": "phase_text", "phase": "verification", "text": "Using cached confidence/verification."})
             emit({"type": "phase_end", "phase": "verification"})
             cached_response['from_cache'] = True
+            cache_match = cached_response.setdefault('cache_match', {"type": "exact"})
             cached_response['execution_log'] = [{
                 "step": "cache_hit",
                 "timestamp": time.time(),
-                "details": {"cached": True, "original_cache_time": cached_response.get('created_at')}
+                "details": {"cached": True, "cache_match": cache_match,
+                            "original_cache_time": cached_response.get('created_at')}
             }]
             return cached_response
         
         print("🔍 CACHE MISS: Processing query normally")
         context = {"user_query": user_query, "original_query": original_query, "original_lang": original_lang}
+        if prefetched_search is not None and user_query == original_query:
+            context["prefetched_search"] = prefetched_search
+        elif query_embedding is not None:
+            context["query_embedding"] = query_embedding
         
         emit({"type": "phase_start", "phase": "query_understanding", "message": "Analyzing intent and keywords"})
         print("PHASE 1: Query Understanding")
@@ -530,6 +550,31 @@ class Orchestrator:
         
         return response
     
+    def run_query_batch(self, queries: List[str], use_cache: bool = True) -> List[Dict[str, Any]]:
+        """Run several queries concurrently; their vector searches share one search_batch call"""
+        # Casual and to-be-translated queries never search with their original text
+        searchable = [
+            q for q in dict.fromkeys(queries)
+            if self._detect_query_type(q) != 'casual' and not self._is_non_english(q)
+        ]
+        prefetched = {}
+        if searchable and HYBRID_AVAILABLE and isinstance(self.retrieval_agent, HybridRetrievalAgent):
+            try:
+                hits = self.vector_store.search_batch(searchable, k=BATCH_SEARCH_K)
+                prefetched = dict(zip(searchable, hits))
+            except Exception as e:
+                print(f"Warning: Batched vector search failed, searching per query: {e}")
+        
+        def run(query: str) -> Dict[str, Any]:
+            try:
+                return self.run_query(query, use_cache=use_cache, prefetched_search=prefetched.get(query))
+            except Exception as e:
+                return {"success": False, "error": str(e), "query": query, "execution_log": []}
+        
+        # Each query is dominated by LLM round-trips, so they overlap on threads
+        with ThreadPoolExecutor(max_workers=min(len(queries), BATCH_MAX_WORKERS) or 1) as pool:
+            return list(pool.map(run, queries))
+    
     def _detect_artifact_need(self, query: str, answer: str, intent: str) -> Dict[str, Any]:
         """Detect if the response should open Canvas/Artifact panel"""
         # Keywords that suggest artifact creation
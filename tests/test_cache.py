@@ -0,0 +1,139 @@
+"""
+ResponseCache tests: L1 + background writer, KB invalidation, semantic lookup
+"""
+import sqlite3
+import threading
+import zlib
+
+import numpy as np
+import pytest
+
+import cache
+from cache import ResponseCache
+
+DIM = 16
+
+
+class _FakeStore:
+    """The slice of VectorStore the cache reads: KB counters, version, lock and embed()"""
+
+    dimension = DIM
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.documents, self.ids = [], []
+        self.document_count = 0
+        self.version = 0
+
+    def add(self, n):
+        self.documents += ["chunk"] * n
+        self.ids += [str(len(self.ids) + i) for i in range(n)]
+        self.document_count += 1
+        self.version += 1
+
+    def embed(self, texts):
+        rows = np.stack([
+            np.random.default_rng(zlib.crc32(t.strip().lower().encode())).standard_normal(DIM)
+            for t in texts
+        ]).astype(np.float32)
+        return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def store():
+    vs = _FakeStore()
+    vs.add(3)
+    return vs
+
+
+@pytest.fixture
+def response_cache(tmp_path, store):
+    rc = ResponseCache(db_path=str(tmp_path / "cache" / "responses.db"))
+    rc.set_vector_store(store)
+    yield rc
+    rc.flush()
+
+
+def _rows(rc):
+    rc.flush()
+    with sqlite3.connect(rc.db_path) as conn:
+        return conn.execute("SELECT user_query, kb_hash FROM cached_responses ORDER BY id").fetchall()
+
+
+def _answer(text):
+    return {"success": True, "answer": text}
+
+
+def test_set_is_served_from_l1_and_committed_by_the_writer(response_cache):
+    response_cache.set("What is RAG?", _answer("retrieval"))
+    assert response_cache.get("  what is rag? ")["answer"] == "retrieval"
+
+    assert [q for q, _ in _rows(response_cache)] == ["What is RAG?"]
+    # Without L1 the committed row is read back from SQLite
+    response_cache._clear_l1()
+    assert response_cache.get("What is RAG?")["answer"] == "retrieval"
+
+
+def test_failed_responses_are_not_cached(response_cache):
+    response_cache.set("q", {"success": False, "error": "boom"})
+    assert response_cache.get("q") is None
+    assert _rows(response_cache) == []
+
+
+def test_hits_are_independent_copies(response_cache):
+    response_cache.set("q", _answer("a"))
+    response_cache.get("q")["answer"] = "mutated"
+    assert response_cache.get("q")["answer"] == "a"
+
+
+def test_kb_change_misses_and_invalidate_by_kb_drops_stale_rows(response_cache, store):
+    response_cache.set("old question", _answer("old"))
+    response_cache.flush()
+
+    store.add(2)
+    assert response_cache.get("old question") is None
+    response_cache.set("new question", _answer("new"))
+
+    assert response_cache.invalidate_by_kb() == 1
+    assert [q for q, _ in _rows(response_cache)] == ["new question"]
+    assert response_cache.get("new question")["answer"] == "new"
+
+
+def test_clear_all_drops_queued_and_committed_rows(response_cache):
+    for i in range(10):
+        response_cache.set(f"q{i}", _answer(str(i)))
+    response_cache.clear_all()
+    assert _rows(response_cache) == []
+    assert response_cache.get("q3") is None
+
+
+def test_invalidate_by_query_substring(response_cache):
+    response_cache.set("about report.pdf", _answer("a"))
+    response_cache.set("about notes.md", _answer("b"))
+    assert response_cache.invalidate_by_query_substring("report.pdf") == 1
+    assert response_cache.get("about report.pdf") is None
+    assert response_cache.get("about notes.md")["answer"] == "b"
+
+
+def test_semantic_hits_are_flagged(response_cache, store):
+    response_cache.set("How does attention work?", _answer("softmax"))
+    hit = response_cache.semantic_lookup("how does attention work?  ")
+    assert hit["answer"] == "softmax"
+    assert hit["cache_match"]["type"] == "semantic"
+    assert hit["cache_match"]["similarity"] == pytest.approx(1.0, abs=1e-5)
+
+    embedding = store.embed(["How does attention work?"])[0]
+    assert response_cache.semantic_lookup("unused", query_embedding=embedding)["answer"] == "softmax"
+    assert response_cache.semantic_lookup("Something unrelated") is None
+
+
+def test_semantic_cache_can_be_disabled(response_cache, monkeypatch):
+    response_cache.set("How does attention work?", _answer("softmax"))
+    monkeypatch.setattr(cache, "SEMANTIC_CACHE_ENABLED", False)
+    assert response_cache.semantic_lookup("How does attention work?") is None
+    assert response_cache.get("How does attention work?")["answer"] == "softmax"
+
+
+def test_query_hash_normalizes_both_paths_alike():
+    assert cache._query_hash("\x1cWhat is RAG? ") == cache._query_hash("what is rag?")
+    assert cache._query_hash("　Straße ") == cache._query_hash("straße")
@@ -0,0 +1,73 @@
+"""
+CodeValidator import policy: built-in lists are a floor the config cannot lift
+"""
+import pytest
+
+from agent_space.tools import code_tools
+from agent_space.tools.code_tools import CodeValidator
+
+BLOCKED = [
+    "import os",
+    "import os.path",
+    "from os import system",
+    "from subprocess import Popen",
+    "from importlib import import_module",
+    "import pickle, json",
+]
+NOT_ALLOWED = ["import torch", "from torch import nn", "from . import helpers"]
+ALLOWED = ["import numpy.linalg", "from collections import Counter", "import decimal", "import json as j"]
+
+
+def _check(code):
+    return CodeValidator.check_imports(code)[0]
+
+
+@pytest.fixture(params=["configured", "missing", "unparsable"])
+def config(request, tmp_path, monkeypatch):
+    """Run each policy test with the shipped config, no config and a broken one"""
+    if request.param == "missing":
+        monkeypatch.setattr(code_tools, "CAPABILITIES_PATH", tmp_path / "absent.yaml")
+    elif request.param == "unparsable":
+        path = tmp_path / "capabilities.yaml"
+        path.write_text("capabilities: [unclosed\n")
+        monkeypatch.setattr(code_tools, "CAPABILITIES_PATH", path)
+    return request.param
+
+
+@pytest.mark.parametrize("code", BLOCKED)
+def test_blocked_imports_fail_closed(config, code):
+    assert not _check(code)
+
+
+@pytest.mark.parametrize("code", NOT_ALLOWED)
+def test_unlisted_imports_are_rejected(config, code):
+    assert not _check(code)
+
+
+@pytest.mark.parametrize("code", ALLOWED)
+def test_allowlisted_imports_pass(config, code):
+    assert _check(code)
+
+
+def _write_policy(tmp_path, allowed, blocked):
+    def items(names):
+        return "".join(f"\n        - \"{name}\"" for name in names)
+    path = tmp_path / "capabilities.yaml"
+    path.write_text(
+        "capabilities:\n"
+        "  code_execution:\n"
+        "    python:\n"
+        "      enabled: true\n"
+        f"      allowed_imports:{items(allowed)}\n"
+        f"      blocked_imports:{items(blocked)}\n"
+    )
+    return path
+
+
+def test_config_can_block_more_but_not_unblock(tmp_path, monkeypatch):
+    path = _write_policy(tmp_path, allowed=["os", "torch"], blocked=["json"])
+    monkeypatch.setattr(code_tools, "CAPABILITIES_PATH", path)
+    assert not _check("import json")
+    assert not _check("from json import loads")
+    assert not _check("import os")
+    assert _check("import torch")
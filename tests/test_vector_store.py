@@ -0,0 +1,120 @@
+"""
+VectorStore index tests: persistence, staging/training (no model download: embeddings come from a seeded stub)
+"""
+import sys
+import types
+import zlib
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+DIM = 64
+
+
+class _HashEmbedder:
+    """Deterministic stand-in for SentenceTransformer: one seeded vector per text"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def get_sentence_embedding_dimension(self):
+        return DIM
+
+    def encode(self, texts, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        return np.stack([
+            np.random.default_rng(zlib.crc32(t.encode())).standard_normal(DIM).astype(np.float32)
+            for t in texts
+        ])
+
+
+@pytest.fixture
+def store_cls(monkeypatch):
+    if "sentence_transformers" not in sys.modules:
+        try:
+            import sentence_transformers  # noqa: F401
+        except ImportError:
+            stub = types.ModuleType("sentence_transformers")
+            stub.SentenceTransformer = _HashEmbedder
+            monkeypatch.setitem(sys.modules, "sentence_transformers", stub)
+    import vector_store
+    monkeypatch.setattr(vector_store, "_EMBEDDING_MODELS", {})
+    monkeypatch.setattr(vector_store.VectorStore, "_load_embedding_model",
+                        lambda self, cache_dir: _HashEmbedder())
+    return vector_store.VectorStore
+
+
+def _add(store, prefix, n):
+    store.add_documents(
+        [f"{prefix} chunk {i}" for i in range(n)],
+        [{"source": f"{prefix}.pdf", "file_hash": prefix} for _ in range(n)],
+        [f"{prefix}-{i}" for i in range(n)],
+    )
+
+
+@pytest.mark.parametrize("index_type", ["ivfpq", "flat", "sq_fp16"])
+def test_add_documents_to_reopened_mmapped_store(store_cls, tmp_path, index_type):
+    options = {"index_type": index_type, "nlist": 4, "M": 8, "nbits": 4}
+    store = store_cls(persist_directory=str(tmp_path), **options)
+    _add(store, "base", 800)
+    if index_type == "ivfpq":
+        assert isinstance(store.index, faiss.IndexIVFPQ)
+
+    reopened = store_cls(persist_directory=str(tmp_path), mmap=True, **options)
+    assert reopened.index.ntotal == 800
+    _add(reopened, "upload", 3)
+    assert reopened.index.ntotal == reopened.chunk_count == 803
+
+    hit = reopened.search("upload chunk 1", k=1)
+    assert hit["ids"] == ["upload-1"]
+
+    # The write was persisted and the new file maps again
+    again = store_cls(persist_directory=str(tmp_path), mmap=True, **options)
+    assert again.index.ntotal == 803
+    assert again.delete_by_file_hash("upload") == 3
+    assert again.index.ntotal == 800
+
+
+def test_reopen_keeps_the_persisted_index_type(store_cls, tmp_path):
+    store = store_cls(persist_directory=str(tmp_path), index_type="sq_fp16")
+    _add(store, "base", 5)
+
+    reopened = store_cls(persist_directory=str(tmp_path), index_type="ivfpq")
+    assert reopened.index_type == "sq_fp16"
+    assert isinstance(reopened.index, faiss.IndexScalarQuantizer)
+    _add(reopened, "more", 2)
+    assert store_cls(persist_directory=str(tmp_path)).index.ntotal == 7
+
+
+def test_ivfpq_stages_flat_until_it_can_train(store_cls, tmp_path):
+    # nlist=4, nbits=4: training needs max(39 * 4, 39 * 16) = 624 vectors
+    store = store_cls(persist_directory=str(tmp_path), index_type="ivfpq", nlist=4, M=8, nbits=4, nprobe=2)
+    _add(store, "base", 600)
+    assert isinstance(store.index, faiss.IndexFlat)
+
+    _add(store, "more", 100)
+    assert isinstance(store.index, faiss.IndexIVFPQ)
+    assert store.index.ntotal == 700 and store.index.nlist == 4 and store.index.nprobe == 2
+    store.set_nprobe(4)
+    assert store.index.nprobe == 4
+    assert store.search("more chunk 7", k=1)["ids"] == ["more-7"]
+
+
+def test_sq8_stages_flat_until_the_training_sample_exists(store_cls, tmp_path, monkeypatch):
+    import vector_store
+    monkeypatch.setattr(vector_store, "SQ8_TRAIN_SIZE", 300)
+    store = store_cls(persist_directory=str(tmp_path), index_type="sq8")
+    _add(store, "base", 299)
+    assert isinstance(store.index, faiss.IndexFlat)
+
+    _add(store, "more", 1)
+    assert isinstance(store.index, faiss.IndexScalarQuantizer)
+    assert store.index.ntotal == 300
+    assert store.search("base chunk 42", k=1)["ids"] == ["base-42"]
+
+    reopened = store_cls(persist_directory=str(tmp_path), index_type="sq8")
+    assert isinstance(reopened.index, faiss.IndexScalarQuantizer)
+    assert reopened.index.ntotal == 300
@@ -1,40 +1,106 @@
 import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import math
 import os
+from collections import Counter, defaultdict
 import pickle
 import json
 from pathlib import Path
 import threading
 
+INDEX_TYPES = ("flat", "sq_fp16", "sq8", "ivfpq")
+# Options every entry point (API server, Streamlit app) opens ./faiss_db with.
+# VECTOR_STORE_ENCODER: flat | sq_fp16 | sq8 | ivfpq. SQ8/IVF-PQ kick in once the KB is large
+# enough to train (nlist defaults to 4*sqrt(N)); smaller KBs stay on the exact flat index.
+# VECTOR_STORE_MMAP=1 maps the index file so API workers share it via the page cache
+VECTOR_STORE_OPTIONS = {
+    "index_type": os.getenv("VECTOR_STORE_ENCODER", "ivfpq"),
+    "nprobe": 16,
+    "mmap": os.getenv("VECTOR_STORE_MMAP", "0") == "1",
+}
+# SQ8 learns per-dimension ranges; vectors stay flat until a sample this size exists
+SQ8_TRAIN_SIZE = 10000
+
+# One embedding model per process, shared by every VectorStore (and, through
+# VectorStore.embed, the response cache); re-creating the store on KB clear reuses it
+_EMBEDDING_MODELS: Dict[str, SentenceTransformer] = {}
+_EMBEDDING_MODELS_LOCK = threading.Lock()
+
+
+def _count_images(images: str) -> int:
+    """Count comma-separated image paths in a chunk's 'images' metadata field"""
+    if not images:
+        return 0
+    return len([x for x in images.split(',') if x.strip()])
+
+
 class VectorStore:
-    def __init__(self, persist_directory: str = "./faiss_db"):
+    def __init__(self, persist_directory: str = "./faiss_db", index_type: str = "flat",
+                 nlist: Optional[int] = None, M: Optional[int] = None, nbits: int = 8, nprobe: int = 16,
+                 mmap: bool = False):
+        """
+        index_type: "flat" (exact IndexFlatIP), "sq_fp16" (vectors stored as fp16,
+        half the bytes scanned per query), "sq8" (int8 codes, a quarter) or "ivfpq".
+        SQ8 and IVF-PQ vectors are staged in a flat index until there are enough
+        of them to train the quantizers; for IVF-PQ, nlist defaults to 4*sqrt(N)
+        at training time and M (PQ sub-quantizers) to d/4.
+        mmap: map the persisted index instead of reading it into memory, so pages
+        are loaded on demand and shared by every process opening the same file.
+        """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index_type {index_type!r}, expected one of {INDEX_TYPES}")
         self.persist_directory = persist_directory
+        self.index_type = index_type
+        self.nlist = nlist
+        self.pq_m = M
+        self.pq_nbits = nbits
+        self.nprobe = nprobe
+        self.mmap = mmap
         os.makedirs(persist_directory, exist_ok=True)
         
         # Use local cache for offline operation
         cache_dir = os.path.join(os.path.dirname(__file__), 'model_cache')
         os.makedirs(cache_dir, exist_ok=True)
 
-        self.embedding_model = self._load_embedding_model(cache_dir)
+        with _EMBEDDING_MODELS_LOCK:
+            if cache_dir not in _EMBEDDING_MODELS:
+                _EMBEDDING_MODELS[cache_dir] = self._load_embedding_model(cache_dir)
+        self.embedding_model = _EMBEDDING_MODELS[cache_dir]
         self.dimension = self.embedding_model.get_sentence_embedding_dimension()
         
         # Threading lock for race condition prevention (BUG-001 FIX)
         self._lock = threading.Lock()
+        # Read-only list snapshot, rebuilt lazily after writes
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._version = 0
         
+        # True while self.index is the read-only mapping of index_path
+        self._mapped = False
         self.index_path = os.path.join(persist_directory, "index.faiss")
         self.metadata_path = os.path.join(persist_directory, "metadata.json")
         
         if os.path.exists(self.index_path) and os.path.exists(self.metadata_path):
             try:
-                self.index = faiss.read_index(self.index_path)
+                io_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+                self.index = faiss.read_index(self.index_path, io_flags)
+                self._mapped = mmap
+                self._apply_nprobe()
                 # BUG-011 FIX: Use JSON instead of pickle for safe deserialization
                 with open(self.metadata_path, 'r', encoding='utf-8') as f:
                     data = json.load(f)
                     self.documents = data.get('documents', [])
                     self.metadatas = data.get('metadatas', [])
                     self.ids = data.get('ids', [])
+                    # The encoding a store was built with wins over the requested one
+                    stored_type = data.get('index_type')
+                    if stored_type in INDEX_TYPES and stored_type != self.index_type:
+                        print(f"Note: {persist_directory} was built as {stored_type!r}; "
+                              f"using it instead of {self.index_type!r}")
+                        self.index_type = stored_type
+                self._reset_stats()
+                self._update_stats(self.documents, self.metadatas)
                 # Validate data consistency
                 if len(self.documents) != self.index.ntotal:
                     print(f"Warning: Index mismatch. Rebuilding index...")
@@ -50,10 +116,36 @@ class VectorStore:
     
     def _init_empty(self):
         """Initialize empty vector store"""
-        self.index = faiss.IndexFlatIP(self.dimension)
+        self.index = self._new_index()
+        self._mapped = False
         self.documents = []
         self.metadatas = []
         self.ids = []
+        self._reset_stats()
+    
+    def _reset_stats(self):
+        """Incrementally maintained KB statistics, so read paths never rescan metadatas"""
+        # per_source keeps first-seen order; file_hashes holds each source's first chunk hash
+        self._stats = {"chunk_count": 0, "bytes": 0, "per_source": defaultdict(Counter), "file_hashes": {}}
+    
+    def _update_stats(self, texts: List[str], metadatas: List[Dict[str, Any]], sign: int = 1):
+        """Apply added (sign=1) or removed (sign=-1) chunks to the running stats"""
+        per_source = self._stats["per_source"]
+        file_hashes = self._stats["file_hashes"]
+        for text, meta in zip(texts, metadatas):
+            source = meta.get('source', 'unknown')
+            n_bytes = len(text.encode('utf-8'))
+            if sign > 0:
+                file_hashes.setdefault(source, meta.get('file_hash', 'unknown'))
+            entry = per_source[source]
+            entry["chunks"] += sign
+            entry["images"] += sign * _count_images(meta.get('images', ''))
+            entry["bytes"] += sign * n_bytes
+            if entry["chunks"] <= 0:
+                del per_source[source]
+                file_hashes.pop(source, None)
+            self._stats["chunk_count"] += sign
+            self._stats["bytes"] += sign * n_bytes
 
     def _resolve_local_snapshot(self, cache_dir: str, repo_id: str) -> str:
         """Return the path to the first local snapshot of a HF repo if it exists."""
@@ -79,16 +171,105 @@ class VectorStore:
     
     def _rebuild_index(self):
         """Rebuild FAISS index from documents"""
-        self.index = faiss.IndexFlatIP(self.dimension)
+        self.index = self._new_index()
+        self._mapped = False
         if self.documents:
-            embeddings = np.array([self._generate_embedding(doc) for doc in self.documents])
+            embeddings = self._generate_embeddings(self.documents)
             faiss.normalize_L2(embeddings)
             self.index.add(embeddings)
+            self._maybe_train()
             self._save()
     
-    def _generate_embedding(self, text: str) -> np.ndarray:
-        embedding = self.embedding_model.encode(text, convert_to_numpy=True)
-        return embedding.astype('float32')
+    def _new_index(self):
+        """Create an empty index for the configured encoding (IVF-PQ starts flat)"""
+        if self.index_type == "sq_fp16":
+            # Faiss' SIMD (AVX2/NEON) distance kernels decode fp16 on the fly; no training needed
+            return faiss.IndexScalarQuantizer(self.dimension, faiss.ScalarQuantizer.QT_fp16,
+                                              faiss.METRIC_INNER_PRODUCT)
+        return faiss.IndexFlatIP(self.dimension)
+    
+    def _ensure_writable(self):
+        """Copy a memory-mapped index into RAM before its first write (caller holds _lock).
+        
+        The mapping is read-only (an IVF index's OnDiskInvertedLists refuse add_entries),
+        so the first upload after a restart takes a private in-memory copy; _save then
+        replaces the file, which other processes keep reading through their own mapping.
+        """
+        if not self._mapped:
+            return
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is None:
+            self.index = faiss.deserialize_index(faiss.serialize_index(self.index))
+        else:
+            # Serializing would keep referring to the mapped lists; copy them list by list
+            mapped = ivf.invlists
+            lists = faiss.ArrayInvertedLists(mapped.nlist, mapped.code_size)
+            for list_no in range(mapped.nlist):
+                size = mapped.list_size(list_no)
+                if size:
+                    lists.add_entries(list_no, size, mapped.get_ids(list_no), mapped.get_codes(list_no))
+            ivf.replace_invlists(lists, True)
+            lists.this.disown()  # now owned by the index
+        self._mapped = False
+    
+    def _maybe_train(self):
+        """Migrate the flat staging index to SQ8/IVF-PQ once enough vectors exist to train it"""
+        if self.index_type not in ("sq8", "ivfpq") or not isinstance(self.index, faiss.IndexFlat):
+            return
+        n = self.index.ntotal
+        if self.index_type == "sq8":
+            if n < SQ8_TRAIN_SIZE:
+                return
+            vectors = self.index.reconstruct_n(0, n)
+            index = faiss.IndexScalarQuantizer(self.dimension, faiss.ScalarQuantizer.QT_8bit,
+                                               faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+            index.add(vectors)
+            self.index = index
+            return
+        
+        nlist = self.nlist or max(1, int(4 * math.sqrt(n)))
+        # Faiss wants ~39 training points per centroid for both the coarse and PQ codebooks
+        if n < max(39 * nlist, 39 * (1 << self.pq_nbits)):
+            return
+        vectors = self.index.reconstruct_n(0, n)
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        index = faiss.IndexIVFPQ(quantizer, self.dimension, nlist, self._pq_subquantizers(), self.pq_nbits,
+                                 faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.add(vectors)
+        self.index = index
+        self._apply_nprobe()
+    
+    def _pq_subquantizers(self) -> int:
+        m = self.pq_m or max(1, self.dimension // 4)
+        # PQ splits each vector into M equal sub-vectors, so M must divide d
+        while self.dimension % m:
+            m -= 1
+        return m
+    
+    def _apply_nprobe(self):
+        if isinstance(self.index, faiss.IndexIVF):
+            self.index.nprobe = self.nprobe
+    
+    def set_nprobe(self, nprobe: int):
+        """Adjust how many IVF lists are scanned per query (no reindexing needed)"""
+        with self._lock:
+            self.nprobe = nprobe
+            self._apply_nprobe()
+    
+    def _generate_embeddings(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """Embed many texts in one encode call, as a contiguous (n, d) float32 matrix"""
+        embeddings = self.embedding_model.encode(
+            texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False
+        )
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """L2-normalized embeddings, so inner products are cosine similarities"""
+        embeddings = self._generate_embeddings(texts)
+        faiss.normalize_L2(embeddings)
+        return embeddings
     
     def _normalize_embeddings(self, embeddings: np.ndarray) -> np.ndarray:
         """Normalize embeddings for cosine similarity with IndexFlatIP"""
@@ -115,7 +296,7 @@ class VectorStore:
             return
         
         # Phase 2: Generate embeddings outside lock (CPU-heavy, no shared state)
-        embeddings = np.array([self._generate_embedding(text) for text in new_texts])
+        embeddings = self._generate_embeddings(new_texts)
         faiss.normalize_L2(embeddings)
         
         # Phase 3: Add to index under lock (mutates shared state)
@@ -124,70 +305,83 @@ class VectorStore:
             final_texts = []
             final_metadatas = []
             final_ids = []
-            final_embeddings = []
+            keep = []
             current_ids = set(self.ids)
             for i, doc_id in enumerate(new_ids):
                 if doc_id not in current_ids:
                     final_texts.append(new_texts[i])
                     final_metadatas.append(new_metadatas[i])
                     final_ids.append(doc_id)
-                    final_embeddings.append(embeddings[i])
+                    keep.append(i)
                     current_ids.add(doc_id)
             
             if not final_texts:
                 print("No new documents to add (all duplicates after re-check)")
                 return
             
-            final_emb_array = np.array(final_embeddings)
-            self.index.add(final_emb_array)
+            self._ensure_writable()
+            self.index.add(embeddings if len(keep) == len(embeddings) else embeddings[keep])
             self.documents.extend(final_texts)
             self.metadatas.extend(final_metadatas)
             self.ids.extend(final_ids)
+            self._invalidate_views()
+            self._update_stats(final_texts, final_metadatas)
             
+            self._maybe_train()
             self._save()
     
     def search(self, query: str, k: int = 5) -> Dict[str, Any]:
-        # Generate embedding outside the lock (CPU-bound, doesn't need shared state)
-        query_embedding = self._generate_embedding(query).reshape(1, -1)
-        faiss.normalize_L2(query_embedding)
-        
+        return self.search_batch([query], k)[0]
+    
+    def search_batch(self, queries: List[str], k: int = 5) -> List[Dict[str, Any]]:
+        """Search several queries with one encode call and one (nq, d) index.search"""
+        # Generate embeddings outside the lock (CPU-bound, doesn't need shared state)
+        return self.search_embeddings(self.embed(queries), k)
+    
+    def search_embeddings(self, query_embeddings: np.ndarray, k: int = 5) -> List[Dict[str, Any]]:
+        """search_batch for queries already embedded with embed()"""
         with self._lock:
             if len(self.documents) == 0:
-                return {
-                    "documents": [],
-                    "metadatas": [],
-                    "distances": [],
-                    "ids": []
-                }
+                return [
+                    {"documents": [], "metadatas": [], "distances": [], "ids": []}
+                    for _ in query_embeddings
+                ]
             
             k = min(k, len(self.documents))
-            distances, indices = self.index.search(query_embedding, k)
-            
-            # Filter out invalid indices (-1 returned by FAISS when fewer results than k)
-            results_docs = []
-            results_meta = []
-            results_ids = []
-            results_distances = []
+            distances, indices = self.index.search(query_embeddings, k)
             
-            for idx, dist in zip(indices[0], distances[0]):
-                if idx >= 0 and idx < len(self.documents):
-                    results_docs.append(self.documents[idx])
-                    results_meta.append(self.metadatas[idx])
-                    results_ids.append(self.ids[idx])
-                    results_distances.append(float(dist))
-        
-            return {
-                "documents": results_docs,
-                "metadatas": results_meta,
-                "distances": results_distances,
-                "ids": results_ids
-            }
+            results = []
+            for row_indices, row_distances in zip(indices, distances):
+                # Filter out invalid indices (-1 returned by FAISS when fewer results than k)
+                results_docs = []
+                results_meta = []
+                results_ids = []
+                results_distances = []
+                
+                for idx, dist in zip(row_indices, row_distances):
+                    if idx >= 0 and idx < len(self.documents):
+                        results_docs.append(self.documents[idx])
+                        results_meta.append(self.metadatas[idx])
+                        results_ids.append(self.ids[idx])
+                        results_distances.append(float(dist))
+                
+                results.append({
+                    "documents": results_docs,
+                    "metadatas": results_meta,
+                    "distances": results_distances,
+                    "ids": results_ids
+                })
+            return results
     
     def _save(self):
         """Save index and metadata - BUG-011 FIX: Use JSON for safe serialization"""
-        faiss.write_index(self.index, self.index_path)
+        # Write-then-rename: readers that mapped the old file keep a valid inode
+        tmp_path = self.index_path + ".tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.index_path)
         with open(self.metadata_path, 'w', encoding='utf-8') as f:
             json.dump({
+                'index_type': self.index_type,
                 'documents': self.documents,
                 'metadatas': self.metadatas,
                 'ids': self.ids
@@ -199,42 +393,97 @@ class VectorStore:
                 os.remove(self.index_path)
             if os.path.exists(self.metadata_path):
                 os.remove(self.metadata_path)
-            self.index = faiss.IndexFlatIP(self.dimension)
+            self.index = self._new_index()
+            self._mapped = False
             self.documents = []
             self.metadatas = []
             self.ids = []
+            self._invalidate_views()
+            self._reset_stats()
     
     def get_collection_count(self) -> int:
         with self._lock:
             return len(self.documents)
     
+    @property
+    def document_count(self) -> int:
+        """Number of distinct sources in the KB (O(1), from the running stats)"""
+        return len(self._stats["per_source"])
+    
+    @property
+    def chunk_count(self) -> int:
+        return self._stats["chunk_count"]
+    
+    @property
+    def version(self) -> int:
+        """Bumped on every write, so an unchanged version means unchanged contents"""
+        return self._version
+    
+    @property
+    def text_bytes(self) -> int:
+        """UTF-8 size of all chunk texts, kept current by add/delete"""
+        return self._stats["bytes"]
+    
     def get_stats(self) -> Dict[str, Any]:
         """Return thread-safe snapshot of vector store statistics."""
-        with self._lock:
-            doc_count = len(set(m.get('source', '') for m in self.metadatas))
-            chunk_count = len(self.documents)
-        return {"document_count": doc_count, "chunk_count": chunk_count}
-    
-    def get_snapshot(self) -> Dict[str, list]:
-        """Return a thread-safe shallow copy of documents and metadatas."""
         with self._lock:
             return {
-                "documents": list(self.documents),
-                "metadatas": list(self.metadatas),
-                "ids": list(self.ids)
+                "document_count": self.document_count,
+                "chunk_count": self.chunk_count,
+                "bytes": self.text_bytes
             }
+    
+    def get_sources(self) -> List[Dict[str, Any]]:
+        """Per-source summaries from the running stats, in first-seen order (O(#sources))"""
+        with self._lock:
+            file_hashes = self._stats["file_hashes"]
+            return [
+                {
+                    "source": source,
+                    "file_hash": file_hashes.get(source, 'unknown'),
+                    "chunks": entry["chunks"],
+                    "images": entry["images"],
+                    "bytes": entry["bytes"],
+                }
+                for source, entry in self._stats["per_source"].items()
+            ]
+    
+    def _invalidate_views(self):
+        """Drop cached read views after a mutation (caller holds _lock)"""
+        self._snapshot = None
+        self._version += 1
+    
+    def get_snapshot(self) -> Dict[str, Any]:
+        """Return an immutable (tuple) view of documents, metadatas and ids.
+        
+        Built once per write and shared by readers until the next one, so a read
+        between writes costs no copy and never waits on the lock.
+        """
+        snap = self._snapshot
+        if snap is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = {
+                        "documents": tuple(self.documents),
+                        "metadatas": tuple(self.metadatas),
+                        "ids": tuple(self.ids),
+                        "version": self._version
+                    }
+                snap = self._snapshot
+        return snap
 
     def delete_by_file_hash(self, file_hash: str) -> int:
         """Delete documents by file hash efficiently with atomic operation (BUG-008 FIX)"""
         with self._lock:
             indices_to_keep = []
-            deleted_count = 0
+            indices_removed = []
             
             for i, meta in enumerate(self.metadatas):
                 if meta.get('file_hash') != file_hash:
                     indices_to_keep.append(i)
                 else:
-                    deleted_count += 1
+                    indices_removed.append(i)
+            deleted_count = len(indices_removed)
             
             if deleted_count == 0:
                 return 0
@@ -245,10 +494,14 @@ class VectorStore:
             old_ids = self.ids.copy()
             
             try:
+                self._update_stats([self.documents[i] for i in indices_removed],
+                                   [self.metadatas[i] for i in indices_removed], sign=-1)
+                
                 # Rebuild with only kept documents
                 self.documents = [self.documents[i] for i in indices_to_keep]
                 self.metadatas = [self.metadatas[i] for i in indices_to_keep]
                 self.ids = [self.ids[i] for i in indices_to_keep]
+                self._invalidate_views()
                 
                 # Rebuild index
                 self._rebuild_index()
@@ -260,10 +513,13 @@ class VectorStore:
                 self.documents = old_documents
                 self.metadatas = old_metadatas
                 self.ids = old_ids
+                self._invalidate_views()
+                self._reset_stats()
+                self._update_stats(self.documents, self.metadatas)
                 self._rebuild_index()
                 return 0
     
     def get_unique_sources(self) -> List[str]:
         """Get list of unique source files"""
         with self._lock:
-            return list(set(meta.get('source', '') for meta in self.metadatas))
+            return list(self._stats["per_source"])